@@ -0,0 +1,348 @@
+#!/usr/bin/env python3
+"""
+Multi-repository batch mode for enforce_logging_metrics and the secret scan.
+
+Takes a manifest of local checkouts and runs both scanners over all of them
+in one process: every file from every repo is scheduled on one shared worker
+pool, rules are the scanner modules' compiled regexes (compiled once at
+import), and file contents are cached by digest so identical files vendored
+across repos are only evaluated once. The output is a single report keyed by
+repo.
+
+Manifest: one checkout per line, optionally `name=path`; `#` comments; paths
+are relative to the manifest. A JSON list of {"name", "path"} also works.
+
+Usage:
+    python scripts/batch_scan.py --manifest repos.txt --json-out /tmp/org-scan.json
+    python scripts/batch_scan.py --manifest repos.txt --scanner logging_metrics --enforce
+"""
+
+from __future__ import annotations
+
+import argparse
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import asdict, dataclass, field, replace
+import hashlib
+import json
+import os
+import pathlib
+import sys
+import threading
+import time
+from typing import TYPE_CHECKING, Any, TypeVar
+
+import enforce_logging_metrics
+from scan_sharding import sort_findings
+import secret_scan_redacted
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterable, Iterator
+
+SCANNERS = ("logging_metrics", "secret")
+DEFAULT_WORKERS = min(32, (os.cpu_count() or 2) * 4)
+MAX_CACHE_ENTRIES = 500_000
+
+T = TypeVar("T")
+
+
+@dataclass(frozen=True)
+class Repo:
+    name: str
+    path: pathlib.Path
+
+
+@dataclass
+class RepoResult:
+    repo: Repo
+    files: int = 0
+    elapsed_s: float = 0.0
+    findings: dict[str, list[dict[str, Any]]] = field(default_factory=dict)
+    # Files that could not be scanned (e.g. symlinks resolving outside the checkout).
+    errors: list[str] = field(default_factory=list)
+
+
+def load_manifest(path: pathlib.Path) -> list[Repo]:
+    """Parse a text or JSON manifest into repos (paths resolved against the manifest)."""
+
+    base = path.resolve().parent
+    text = path.read_text(encoding="utf-8")
+    entries: list[tuple[str, str]] = []
+
+    if text.lstrip().startswith("["):
+        for item in json.loads(text):
+            if isinstance(item, str):
+                entries.append(("", item))
+            else:
+                entries.append((item.get("name") or "", item["path"]))
+    else:
+        for raw in text.splitlines():
+            line = raw.split("#", 1)[0].strip()
+            if not line:
+                continue
+            name, _, repo_path = line.rpartition("=")
+            entries.append((name.strip(), repo_path.strip()))
+
+    repos: list[Repo] = []
+    seen: set[str] = set()
+    for given_name, repo_path in entries:
+        resolved = (base / repo_path).resolve()
+        if not resolved.is_dir():
+            msg = f"checkout is not a directory: {resolved}"
+            raise ValueError(msg)
+        name = given_name or resolved.name
+        if name in seen:
+            msg = f"duplicate repo name in manifest: {name!r}"
+            raise ValueError(msg)
+        seen.add(name)
+        repos.append(Repo(name=name, path=resolved))
+    return repos
+
+
+class ContentCache:
+    """Per-scanner content findings keyed by file digest, shared across repos."""
+
+    def __init__(self, max_entries: int = MAX_CACHE_ENTRIES) -> None:
+        self._data: dict[tuple[str, bytes], Any] = {}
+        self._lock = threading.Lock()
+        self._max = max_entries
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_compute(self, scanner: str, digest: bytes, compute: Callable[[], T]) -> T:
+        key = (scanner, digest)
+        with self._lock:
+            if key in self._data:
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+        value = compute()
+        with self._lock:
+            if len(self._data) < self._max:
+                self._data[key] = value
+        return value
+
+
+def _plan(
+    repo: Repo, scanners: Iterable[str], errors: list[str]
+) -> dict[pathlib.Path, set[str]]:
+    """Which scanners apply to which file of a repo (each file is read once).
+
+    Files the scanners cannot handle are appended to `errors` instead of
+    aborting the whole batch.
+    """
+
+    def outside(path: pathlib.Path) -> None:
+        rel = path.relative_to(repo.path).as_posix()
+        errors.append(f"{rel}: resolves outside the checkout; not scanned")
+
+    plan: dict[pathlib.Path, set[str]] = {}
+    if "secret" in scanners:
+        for p in secret_scan_redacted.iter_files(repo.path):
+            plan.setdefault(p, set()).add("secret")
+    if "logging_metrics" in scanners:
+        for p in enforce_logging_metrics.iter_python_files(
+            repo.path, repo_root=repo.path, on_outside=outside
+        ):
+            plan.setdefault(p, set()).add("logging_metrics")
+    return plan
+
+
+def _scan_one(
+    repo: Repo, path: pathlib.Path, scanners: set[str], cache: ContentCache
+) -> dict[str, list[dict[str, Any]]]:
+    rel = path.relative_to(repo.path).as_posix()
+    out: dict[str, list[dict[str, Any]]] = {s: [] for s in scanners}
+
+    if "secret" in scanners:
+        out["secret"].extend(asdict(f) for f in secret_scan_redacted.scan_name(rel, path.name))
+
+    try:
+        size = path.stat().st_size
+        needs_content = "logging_metrics" in scanners or size <= secret_scan_redacted.MAX_FILE_BYTES
+        data = path.read_bytes() if needs_content else b""
+    except OSError:
+        return out
+    digest = hashlib.blake2b(data, digest_size=16).digest()
+
+    if "secret" in scanners and size <= secret_scan_redacted.MAX_FILE_BYTES:
+        # Cached findings are path-free; bind them to this file.
+        cached = cache.get_or_compute(
+            "secret", digest, lambda: secret_scan_redacted.scan_file_content("", data)
+        )
+        out["secret"].extend(asdict(replace(f, file=rel)) for f in cached)
+
+    if "logging_metrics" in scanners:
+
+        def _logging() -> list[tuple[str, str]]:
+            try:
+                text = data.decode("utf-8")
+            except UnicodeDecodeError:
+                return []
+            return [
+                (v.rule, v.description)
+                for v in enforce_logging_metrics.find_violations_in_text(path, text)
+            ]
+
+        for rule, description in cache.get_or_compute("logging_metrics", digest, _logging):
+            out["logging_metrics"].append({"file": rel, "rule": rule, "description": description})
+
+    return out
+
+
+def _bounded_submit(
+    pool: ThreadPoolExecutor, jobs: Iterator[tuple[Any, ...]], fn: Callable[..., Any], limit: int
+) -> Iterator[tuple[tuple[Any, ...], Any]]:
+    """Run fn(*job) for every job with at most `limit` in flight; yield (job, result)."""
+
+    in_flight: dict[Future, tuple[Any, ...]] = {}
+    for job in jobs:
+        in_flight[pool.submit(fn, *job)] = job
+        if len(in_flight) >= limit:
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for fut in done:
+                yield in_flight.pop(fut), fut.result()
+    for fut in list(in_flight):
+        yield in_flight.pop(fut), fut.result()
+
+
+def run_batch(
+    repos: list[Repo], scanners: Iterable[str] = SCANNERS, workers: int = DEFAULT_WORKERS
+) -> tuple[list[RepoResult], dict[str, Any]]:
+    """Scan all repos on one shared pool; returns per-repo results and batch stats."""
+
+    scanners = tuple(scanners)
+    missing = [str(r.path) for r in repos if not r.path.is_dir()]
+    if missing:
+        msg = f"checkout is not a directory: {', '.join(missing)}"
+        raise ValueError(msg)
+    started = time.perf_counter()
+    cache = ContentCache()
+    results = {r.name: RepoResult(repo=r, findings={s: [] for s in scanners}) for r in repos}
+    repo_started: dict[str, float] = {}
+    remaining: dict[str, int] = {}
+
+    def jobs() -> Iterator[tuple[Any, ...]]:
+        # Repos are planned lazily so the pool starts on repo 1 while repo 2 is walked.
+        for repo in repos:
+            plan = _plan(repo, scanners, results[repo.name].errors)
+            repo_started[repo.name] = time.perf_counter()
+            remaining[repo.name] = len(plan)
+            results[repo.name].files = len(plan)
+            for path in sorted(plan):
+                yield repo, path, plan[path], cache
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for job, found in _bounded_submit(pool, jobs(), _scan_one, workers * 4):
+            repo = job[0]
+            res = results[repo.name]
+            for scanner, items in found.items():
+                res.findings[scanner].extend(items)
+            remaining[repo.name] -= 1
+            if remaining[repo.name] == 0:
+                res.elapsed_s = round(time.perf_counter() - repo_started[repo.name], 3)
+
+    for res in results.values():
+        for scanner in res.findings:
+            res.findings[scanner] = sort_findings(res.findings[scanner])
+
+    stats = {
+        "repos": len(repos),
+        "files": sum(r.files for r in results.values()),
+        "workers": workers,
+        "cache_hits": cache.hits,
+        "cache_misses": cache.misses,
+        "elapsed_s": round(time.perf_counter() - started, 3),
+    }
+    return [results[r.name] for r in repos], stats
+
+
+def build_report(results: list[RepoResult], stats: dict[str, Any]) -> dict[str, Any]:
+    return {
+        "stats": stats,
+        "repos": [
+            {
+                "name": r.repo.name,
+                "path": str(r.repo.path),
+                "files": r.files,
+                "elapsed_s": r.elapsed_s,
+                "findings": r.findings,
+                "errors": r.errors,
+            }
+            for r in results
+        ],
+    }
+
+
+def _enforce(results: list[RepoResult]) -> int:
+    status = 0
+    for r in results:
+        if r.errors:
+            # Unscanned files fail closed, like unreadable archive members.
+            print(f"== {r.repo.name}: {len(r.errors)} files could not be scanned")
+            for e in r.errors[:200]:
+                print(f" - {e}")
+            status = 1
+        if "secret" in r.findings:
+            print(f"== {r.repo.name}: ", end="")
+            if secret_scan_redacted.run_policy(
+                {"repo_root": str(r.repo.path), "findings": r.findings["secret"]}
+            ):
+                status = 1
+        violations = r.findings.get("logging_metrics") or []
+        if violations:
+            print(f"== {r.repo.name}: {len(violations)} logging/metrics violations")
+            for v in violations[:200]:
+                print(f" - {v['file']}: {v['description']}")
+            status = 1
+    return status
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Scan many checkouts on one shared worker pool.")
+    parser.add_argument("--manifest", required=True, type=pathlib.Path)
+    parser.add_argument(
+        "--scanner",
+        action="append",
+        choices=SCANNERS,
+        help="Scanner to run (repeatable; default: all).",
+    )
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    parser.add_argument("--json-out", help="Write the consolidated per-repo report here.")
+    parser.add_argument(
+        "--enforce",
+        action="store_true",
+        help="Apply the secret-scan policy and fail on logging/metrics violations.",
+    )
+    args = parser.parse_args()
+
+    try:
+        repos = load_manifest(args.manifest)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"BATCH_SCAN_FAILED: bad manifest: {e}", file=sys.stderr)
+        return 2
+
+    results, stats = run_batch(repos, args.scanner or SCANNERS, args.workers)
+
+    if args.json_out:
+        pathlib.Path(args.json_out).write_text(
+            json.dumps(build_report(results, stats), indent=2, sort_keys=True) + "\n",
+            encoding="utf-8",
+        )
+
+    for r in results:
+        counts = ", ".join(f"{s}={len(items)}" for s, items in r.findings.items())
+        print(f"{r.repo.name}: {r.files} files in {r.elapsed_s:.3f}s ({counts})")
+        for e in r.errors:
+            print(f"BATCH_SCAN_WARNING: {r.repo.name}: {e}", file=sys.stderr)
+    print(
+        f"batch: {stats['repos']} repos, {stats['files']} files, {stats['elapsed_s']:.3f}s, "
+        f"cache hits {stats['cache_hits']}/{stats['cache_hits'] + stats['cache_misses']}"
+    )
+
+    if args.enforce:
+        return _enforce(results)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
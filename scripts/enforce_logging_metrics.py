@@ -13,19 +13,23 @@ The fixer updates files in-place and injects `LoggerFactory` imports when missin
 Use from repo root:
     python scripts/enforce_logging_metrics.py --check
     python scripts/enforce_logging_metrics.py --fix
+
+For many checkouts at once, use ``scripts/batch_scan.py --manifest repos.txt``.
 """
 
 from __future__ import annotations
 
 import argparse
 import dataclasses
+import json
 import pathlib
 import re
 import sys
+import time
 from typing import TYPE_CHECKING
 
 if TYPE_CHECKING:
-    from collections.abc import Iterable
+    from collections.abc import Callable, Iterable
 
 LOGGER_PATTERN = re.compile(r"\blogging\.getLogger\s*\(")
 LOGGER_FACTORY_USAGE_PATTERN = re.compile(r"\bLoggerFactory\.get_logger\s*\(")
@@ -61,6 +65,7 @@ class Violation:
 
     path: pathlib.Path
     description: str
+    rule: str = ""
 
 
 def _should_skip(relative_str: str, parts: tuple[str, ...]) -> bool:
@@ -69,20 +74,40 @@ def _should_skip(relative_str: str, parts: tuple[str, ...]) -> bool:
     return any(relative_str.startswith(prefix) for prefix in SKIP_PATH_PREFIXES)
 
 
-def iter_python_files(root: pathlib.Path) -> Iterable[pathlib.Path]:
-    """Yield python files under root respecting skip lists."""
+def _relative(path: pathlib.Path, repo_root: pathlib.Path) -> pathlib.Path | None:
+    try:
+        return path.resolve().relative_to(repo_root)
+    except ValueError:
+        return None
+
+
+def iter_python_files(
+    root: pathlib.Path,
+    repo_root: pathlib.Path = REPO_ROOT,
+    on_outside: Callable[[pathlib.Path], None] | None = None,
+) -> Iterable[pathlib.Path]:
+    """Yield python files under root respecting skip lists.
 
-    if root.is_file():
-        relative = root.resolve().relative_to(REPO_ROOT)
-        if _should_skip(str(relative), relative.parts):
-            return
-        if root.suffix == ".py":
-            yield root
-        return
+    Skip prefixes are matched relative to ``repo_root`` so the same rules apply
+    to any checkout (see ``batch_scan.py``), not only this repository. A file
+    that resolves outside ``repo_root`` (e.g. via a symlink) raises ValueError,
+    unless ``on_outside`` is given: then it is reported there and skipped.
+    """
 
-    for path in root.rglob("*.py"):
-        relative = path.resolve().relative_to(REPO_ROOT)
-        if _should_skip(str(relative), relative.parts):
+    repo_root = repo_root.resolve()
+    candidates = [root] if root.is_file() else root.rglob("*.py")
+
+    for path in candidates:
+        if path.suffix != ".py":
+            continue
+        relative = _relative(path, repo_root)
+        if relative is None:
+            if on_outside is None:
+                msg = f"{path} is outside the repository root {repo_root}"
+                raise ValueError(msg)
+            on_outside(path)
+            continue
+        if _should_skip(relative.as_posix(), relative.parts):
             continue
         yield path
 
@@ -161,30 +186,63 @@ def fix_file(path: pathlib.Path) -> bool:
     return False
 
 
-def find_violations(path: pathlib.Path) -> list[Violation]:
-    """Collect violations in a file."""
+def find_violations_in_text(path: pathlib.Path, text: str) -> list[Violation]:
+    """Collect violations in already-loaded file contents."""
 
-    try:
-        text = path.read_text(encoding="utf-8")
-    except FileNotFoundError:
-        return []
     violations: list[Violation] = []
 
     if LOGGER_PATTERN.search(text):
         violations.append(
             Violation(
-                path=path, description="uses logging.getLogger instead of LoggerFactory"
+                path=path,
+                description="uses logging.getLogger instead of LoggerFactory",
+                rule="logging_get_logger",
             )
         )
 
     if METRICS_PATTERN.search(text):
         violations.append(
-            Violation(path=path, description="instantiates MetricsRegistry() directly")
+            Violation(
+                path=path,
+                description="instantiates MetricsRegistry() directly",
+                rule="metrics_registry_instantiation",
+            )
         )
 
     return violations
 
 
+def find_violations(path: pathlib.Path) -> list[Violation]:
+    """Collect violations in a file."""
+
+    try:
+        text = path.read_text(encoding="utf-8")
+    except FileNotFoundError:
+        return []
+    return find_violations_in_text(path, text)
+
+
+def write_report(
+    out: pathlib.Path, violations: list[Violation], stats: dict[str, float] | None = None
+) -> None:
+    """Write violations as JSON using the scanners' report shape."""
+
+    report = {
+        "scanner": "logging_metrics",
+        "repo_root": str(REPO_ROOT),
+        "stats": stats or {},
+        "findings": [
+            {
+                "file": str(v.path.relative_to(REPO_ROOT)),
+                "rule": v.rule,
+                "description": v.description,
+            }
+            for v in violations
+        ],
+    }
+    out.write_text(json.dumps(report, indent=2, sort_keys=True) + "\n", encoding="utf-8")
+
+
 def main() -> int:
     parser = argparse.ArgumentParser(
         description="Enforce shared logging/metrics usage."
@@ -200,20 +258,39 @@ def main() -> int:
         default=["."],
         help="Directories or files to scan (default: current directory).",
     )
+    parser.add_argument(
+        "--json-out",
+        help="Also write violations as a JSON report (e.g. for findings_store.py).",
+    )
     args = parser.parse_args()
 
     root_paths = [pathlib.Path(p).resolve() for p in args.paths]
+    for raw, root in zip(args.paths, root_paths, strict=True):
+        if not root.is_relative_to(REPO_ROOT):
+            parser.error(f"--paths: {raw} is outside the repository root {REPO_ROOT}")
+
+    started = time.perf_counter()
+    try:
+        files = [f for root in root_paths for f in iter_python_files(root)]
+    except ValueError as e:  # a symlink under --paths that leaves the repository
+        print(f"ERROR: {e}", file=sys.stderr)
+        return 2
 
     if args.fix:
-        for root in root_paths:
-            for file_path in iter_python_files(root):
-                fix_file(file_path)
+        for file_path in files:
+            fix_file(file_path)
         return 0
 
     violations: list[Violation] = []
-    for root in root_paths:
-        for file_path in iter_python_files(root):
-            violations.extend(find_violations(file_path))
+    for file_path in files:
+        violations.extend(find_violations(file_path))
+
+    if args.json_out:
+        stats = {
+            "files_scanned": len(files),
+            "elapsed_s": round(time.perf_counter() - started, 3),
+        }
+        write_report(pathlib.Path(args.json_out), violations, stats)
 
     if not violations:
         return 0
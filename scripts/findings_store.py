@@ -0,0 +1,394 @@
+#!/usr/bin/env python3
+"""
+Opt-in SQLite store for scanner findings (cross-run queries and diffs).
+
+Ingest any scanner JSON report (secret scan, token storage scan, logging
+enforcement, or a merged shard report) as a run, then ask which findings are
+new / fixed / unchanged between two runs, or how a rule's count has moved.
+
+Findings are keyed by a stable fingerprint of (scanner, file, rule, hash of
+the redacted line content, occurrence), so they survive line moves and never
+embed a secret value: matched values are masked before hashing and no line
+text is stored.
+
+Usage:
+    python scripts/findings_store.py ingest /tmp/secret-scan.json --db findings.db --ref develop
+    python scripts/findings_store.py diff @develop @HEAD --db findings.db
+    python scripts/findings_store.py trend inline_secret_assignment --db findings.db
+    python scripts/findings_store.py runs --db findings.db
+"""
+
+from __future__ import annotations
+
+import argparse
+from collections import defaultdict
+from datetime import datetime, timezone
+import hashlib
+import json
+from pathlib import Path
+import sqlite3
+import subprocess
+import sys
+import time
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from secret_scan_redacted import ARCHIVE_MEMBER_SEP, line_hash
+
+DEFAULT_DB = ".scan-cache/findings.db"
+SCHEMA_VERSION = 1
+FINGERPRINT_BYTES = 16
+
+_META_ENCODER = json.JSONEncoder(sort_keys=True, separators=(",", ":"))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id            INTEGER PRIMARY KEY,
+    label         TEXT NOT NULL UNIQUE,
+    scanner       TEXT NOT NULL,
+    ref           TEXT,
+    commit_sha    TEXT,
+    created_at    TEXT NOT NULL,
+    scan_elapsed_s REAL,
+    files_scanned INTEGER,
+    finding_count INTEGER NOT NULL DEFAULT 0,
+    ingest_s      REAL
+);
+CREATE INDEX IF NOT EXISTS runs_scanner_ref ON runs (scanner, ref, id);
+
+CREATE TABLE IF NOT EXISTS findings (
+    run_id      INTEGER NOT NULL REFERENCES runs (id) ON DELETE CASCADE,
+    fingerprint BLOB NOT NULL,
+    rule        TEXT NOT NULL,
+    file        TEXT NOT NULL,
+    line        INTEGER,
+    meta        TEXT,
+    PRIMARY KEY (run_id, fingerprint)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS findings_rule_run ON findings (rule, run_id);
+"""
+
+
+def connect(db_path: str) -> sqlite3.Connection:
+    path = Path(db_path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA foreign_keys=ON")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA cache_size=-65536")
+    conn.executescript(SCHEMA)
+    conn.execute(f"PRAGMA user_version={SCHEMA_VERSION}")
+    return conn
+
+
+class _LineSource:
+    """Fallback for reports without `line_hash`: re-read each file once and hash lines.
+
+    Only correct while the checkout still matches the scanned tree.
+    """
+
+    def __init__(self, root: Optional[Path]) -> None:
+        self._root = root
+        self._cache: Dict[str, Optional[List[str]]] = {}
+
+    def content_hash(self, file: str, line: Optional[int]) -> str:
+        if self._root is None or not line or ARCHIVE_MEMBER_SEP in file:
+            return ""
+        if file not in self._cache:
+            try:
+                text = (self._root / file).read_text(encoding="utf-8", errors="ignore")
+                self._cache[file] = text.splitlines()
+            except OSError:
+                self._cache[file] = None
+        lines = self._cache[file]
+        if lines is None or line > len(lines):
+            return ""
+        return line_hash(lines[line - 1])
+
+
+def check_report(report: Any) -> None:
+    """Reject anything that is not a single scanner report (e.g. a batch_scan report)."""
+    if not isinstance(report, dict) or not isinstance(report.get("findings"), list):
+        msg = "not a scanner report: no top-level findings list"
+        if isinstance(report, dict) and "repos" in report:
+            msg += " (batch_scan report; ingest each repo's scan separately)"
+        raise ValueError(msg)
+
+
+def detect_scanner(report: Dict[str, Any]) -> str:
+    if "scanner" in report:
+        return str(report["scanner"])
+    if "repo_root" in report:
+        return "secret"
+    if "roots" in report:
+        return "token_storage"
+    msg = "cannot tell which scanner produced this report; pass --scanner"
+    raise ValueError(msg)
+
+
+def _normalise(
+    scanner: str, report: Dict[str, Any], lines: _LineSource
+) -> Iterator[Tuple[str, str, Optional[int], str, Dict[str, Any]]]:
+    """(rule, file, line, content_hash, meta) per finding."""
+    for f in report.get("findings") or []:
+        file = str(f.get("file") or "")
+        line = f.get("line")
+        if scanner == "secret":
+            meta = {k: f[k] for k in ("key", "value_len", "note") if f.get(k) is not None}
+            content = f.get("line_hash") or lines.content_hash(file, line)
+            yield f.get("category") or "", file, line, content, meta
+        elif scanner == "token_storage":
+            content = line_hash(f.get("snippet") or "")
+            yield f.get("kind") or "", file, line, content, {"key_hint": f.get("key_hint")}
+        else:
+            yield f.get("rule") or f.get("description") or "", file, line, "", {}
+
+
+def fingerprints(
+    scanner: str, rows: Iterable[Tuple[str, str, Optional[int], str, Dict[str, Any]]]
+) -> Iterator[Tuple[bytes, str, str, Optional[int], Optional[str]]]:
+    """Attach fingerprints; repeated identical lines in a file get an occurrence index."""
+    seen: Dict[Tuple[str, str, str], int] = defaultdict(int)
+    for rule, file, line, content, meta in rows:
+        # Without line content (archives, binaries) the line number is the best anchor.
+        anchor = content or f"line:{line or 0}"
+        occurrence = seen[(file, rule, anchor)]
+        seen[(file, rule, anchor)] += 1
+        key = f"{scanner}\0{file}\0{rule}\0{anchor}\0{occurrence}"
+        fp = hashlib.blake2b(key.encode("utf-8"), digest_size=FINGERPRINT_BYTES).digest()
+        yield fp, rule, file, line, _META_ENCODER.encode(meta) if meta else None
+
+
+def _git_head(root: Path) -> Optional[str]:
+    r = subprocess.run(
+        ["git", "rev-parse", "HEAD"],
+        cwd=root,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+        text=True,
+        check=False,
+    )
+    if r.returncode != 0:
+        return None
+    return r.stdout.strip() or None
+
+
+def ingest_report(
+    conn: sqlite3.Connection,
+    report: Dict[str, Any],
+    label: Optional[str] = None,
+    scanner: Optional[str] = None,
+    ref: Optional[str] = None,
+    root: Optional[Path] = None,
+    scan_elapsed_s: Optional[float] = None,
+) -> int:
+    """Store one report as a run; returns the run id. Re-ingesting a label replaces it.
+
+    Raises ValueError for a report that is not a scanner report.
+    """
+    started = time.perf_counter()
+    check_report(report)
+    scanner = scanner or detect_scanner(report)
+    if root is None and report.get("repo_root"):
+        root = Path(report["repo_root"])
+    commit = _git_head(root) if root is not None and root.is_dir() else None
+    label = label or f"{scanner}@{commit or datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S')}"
+
+    stats = report.get("stats") or {}
+    if scan_elapsed_s is None:
+        scan_elapsed_s = stats.get("elapsed_s")
+
+    # Sorted inserts keep the (run_id, fingerprint) B-tree append-only.
+    normalised = _normalise(scanner, report, _LineSource(root))
+    rows = sorted(fingerprints(scanner, normalised), key=lambda r: r[0])
+
+    with conn:
+        conn.execute("DELETE FROM runs WHERE label = ?", (label,))
+        cur = conn.execute(
+            "INSERT INTO runs"
+            " (label, scanner, ref, commit_sha, created_at, scan_elapsed_s, files_scanned)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (
+                label,
+                scanner,
+                ref,
+                commit,
+                datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                scan_elapsed_s,
+                stats.get("files_scanned"),
+            ),
+        )
+        run_id = int(cur.lastrowid)
+        conn.executemany(
+            "INSERT OR IGNORE INTO findings (run_id, fingerprint, rule, file, line, meta)"
+            " VALUES (?, ?, ?, ?, ?, ?)",
+            ((run_id, *r) for r in rows),
+        )
+        count = conn.execute(
+            "SELECT COUNT(*) FROM findings WHERE run_id = ?", (run_id,)
+        ).fetchone()[0]
+        conn.execute(
+            "UPDATE runs SET finding_count = ?, ingest_s = ? WHERE id = ?",
+            (count, round(time.perf_counter() - started, 3), run_id),
+        )
+    return run_id
+
+
+def resolve_run(
+    conn: sqlite3.Connection, spec: str, scanner: Optional[str] = None
+) -> Tuple[int, str]:
+    """`label`, or `@ref` for the latest run recorded against that ref."""
+    if spec.startswith("@"):
+        q = "SELECT id, scanner FROM runs WHERE ref = ?"
+        params: List[Any] = [spec[1:]]
+        if scanner:
+            q += " AND scanner = ?"
+            params.append(scanner)
+        row = conn.execute(q + " ORDER BY id DESC LIMIT 1", params).fetchone()
+    else:
+        row = conn.execute("SELECT id, scanner FROM runs WHERE label = ?", (spec,)).fetchone()
+    if row is None:
+        raise LookupError(f"no run matches {spec!r}")
+    return int(row[0]), str(row[1])
+
+
+def diff_runs(conn: sqlite3.Connection, base_id: int, head_id: int) -> Dict[str, Any]:
+    """new / fixed / unchanged between two runs (indexed anti-joins on fingerprint)."""
+    new_q = (
+        "SELECT rule, file, line FROM findings h WHERE h.run_id = ? AND NOT EXISTS"
+        " (SELECT 1 FROM findings b WHERE b.run_id = ? AND b.fingerprint = h.fingerprint)"
+        " ORDER BY file, line, rule"
+    )
+    unchanged = conn.execute(
+        "SELECT COUNT(*) FROM findings h"
+        " JOIN findings b ON b.run_id = ? AND b.fingerprint = h.fingerprint"
+        " WHERE h.run_id = ?",
+        (base_id, head_id),
+    ).fetchone()[0]
+    new = conn.execute(new_q, (head_id, base_id)).fetchall()
+    fixed = conn.execute(new_q, (base_id, head_id)).fetchall()
+    return {"new": new, "fixed": fixed, "unchanged": unchanged}
+
+
+def rule_trend(
+    conn: sqlite3.Connection, rule: str, scanner: Optional[str] = None, limit: int = 20
+) -> List[tuple]:
+    """Per-run count of `rule`, over runs of the scanner(s) that emit it."""
+    q = (
+        "SELECT r.label, r.ref, r.created_at, COUNT(f.fingerprint)"
+        " FROM runs r LEFT JOIN findings f ON f.run_id = r.id AND f.rule = ?"
+    )
+    params: List[Any] = [rule]
+    if scanner:
+        q += " WHERE r.scanner = ?"
+        params.append(scanner)
+    else:
+        # Runs of other scanners can never contain the rule; listing them as 0 is noise.
+        q += (
+            " WHERE r.scanner IN (SELECT DISTINCT r2.scanner FROM findings f2"
+            " JOIN runs r2 ON r2.id = f2.run_id WHERE f2.rule = ?)"
+        )
+        params.append(rule)
+    q += " GROUP BY r.id ORDER BY r.id DESC LIMIT ?"
+    params.append(limit)
+    return list(reversed(conn.execute(q, params).fetchall()))
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--db", default=DEFAULT_DB, help=f"SQLite database (default: {DEFAULT_DB})")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+
+    ing = sub.add_parser("ingest", help="Store a scanner JSON report as a run")
+    ing.add_argument("report", type=Path)
+    ing.add_argument("--label", help="Run label (default: <scanner>@<HEAD sha>)")
+    ing.add_argument("--scanner", choices=["secret", "token_storage", "logging_metrics"])
+    ing.add_argument("--ref", help="Branch/ref this run represents, e.g. develop")
+    ing.add_argument(
+        "--root",
+        type=Path,
+        help="Checkout the report paths are relative to (default: report repo_root or cwd)",
+    )
+    ing.add_argument("--elapsed-s", type=float, help="Scan wall time to record with the run")
+
+    dif = sub.add_parser("diff", help="new / fixed / unchanged findings between two runs")
+    dif.add_argument("base", help="Run label or @ref (latest run for that ref)")
+    dif.add_argument("head", help="Run label or @ref")
+    dif.add_argument("--scanner", help="Restrict @ref lookups to one scanner")
+    dif.add_argument("--limit", type=int, default=200, help="Max rows listed per section")
+    dif.add_argument("--json", action="store_true")
+
+    tr = sub.add_parser("trend", help="Per-run count for one rule")
+    tr.add_argument("rule")
+    tr.add_argument("--scanner")
+    tr.add_argument("--limit", type=int, default=20)
+
+    sub.add_parser("runs", help="List runs with timing stats")
+
+    args = ap.parse_args()
+    conn = connect(args.db)
+
+    if args.cmd == "ingest":
+        try:
+            report = json.loads(args.report.read_text(encoding="utf-8"))
+            check_report(report)
+            root = args.root or (None if report.get("repo_root") else Path.cwd())
+            run_id = ingest_report(
+                conn,
+                report,
+                label=args.label,
+                scanner=args.scanner,
+                ref=args.ref,
+                root=root,
+                scan_elapsed_s=args.elapsed_s,
+            )
+        except (OSError, ValueError) as e:
+            print(f"FINDINGS_STORE_FAILED: {args.report}: {e}", file=sys.stderr)
+            return 2
+        label, count, ingest_s = conn.execute(
+            "SELECT label, finding_count, ingest_s FROM runs WHERE id = ?", (run_id,)
+        ).fetchone()
+        print(f"ingested {count} findings as run {label!r} in {ingest_s:.3f}s")
+        return 0
+
+    if args.cmd == "diff":
+        started = time.perf_counter()
+        try:
+            base_id, scanner = resolve_run(conn, args.base, args.scanner)
+            head_id, _ = resolve_run(conn, args.head, args.scanner or scanner)
+        except LookupError as e:
+            print(f"FINDINGS_STORE_FAILED: {e}", file=sys.stderr)
+            return 2
+        d = diff_runs(conn, base_id, head_id)
+        elapsed = time.perf_counter() - started
+        if args.json:
+            print(json.dumps({**d, "elapsed_s": round(elapsed, 3)}, indent=2))
+            return 0
+        print(
+            f"new: {len(d['new'])}  fixed: {len(d['fixed'])}  "
+            f"unchanged: {d['unchanged']}  ({elapsed:.3f}s)"
+        )
+        for section in ("new", "fixed"):
+            for rule, file, line in d[section][: args.limit]:
+                loc = file + (f":L{line}" if line else "")
+                print(f" {'+' if section == 'new' else '-'} {rule}: {loc}")
+        return 0
+
+    if args.cmd == "trend":
+        for label, ref, created_at, count in rule_trend(conn, args.rule, args.scanner, args.limit):
+            print(f"{created_at}  {label}{f' ({ref})' if ref else ''}: {count}")
+        return 0
+
+    for label, scanner, ref, created_at, count, scan_s, files, ingest_s in conn.execute(
+        "SELECT label, scanner, ref, created_at, finding_count,"
+        " scan_elapsed_s, files_scanned, ingest_s FROM runs ORDER BY id"
+    ):
+        scan = f"scan {scan_s:.3f}s/{files} files" if scan_s is not None else "scan n/a"
+        tag = f"{scanner}, {ref}" if ref else scanner
+        print(f"{created_at}  {label} [{tag}] {count} findings; {scan}; ingest {ingest_s:.3f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
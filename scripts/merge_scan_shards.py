@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Merge sharded scanner reports (CI matrix) into one report.
+
+Each matrix job runs a scanner with `--shard i/N --json-out shard-i.json`.
+This tool checks that every shard 1..N is present exactly once, writes a
+merged report whose findings are identical to a single-job run (stats carry
+the summed file count and the slowest shard's time), applies the scanner's
+policy once, and prints per-shard timings so skew is visible.
+
+Usage:
+    python scripts/merge_scan_shards.py secret shard-*.json --json-out /tmp/secret-scan.json
+    python scripts/merge_scan_shards.py token-storage shard-*.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import Any, Dict, List
+
+import secret_scan_redacted
+import token_storage_scan
+from scan_sharding import sort_findings
+
+# Report keys that must agree across shards (everything except findings/shard/stats).
+HEADER_KEYS = {
+    "secret": ("repo_root",),
+    "token-storage": ("roots",),
+}
+
+
+def _fail(msg: str) -> None:
+    print(f"SHARD_MERGE_FAILED: {msg}", file=sys.stderr)
+
+
+def _load(paths: List[Path]) -> List[Dict[str, Any]]:
+    """Read shard reports; an unmatched glob arrives here as a literal `*.json` path."""
+    reports: List[Dict[str, Any]] = []
+    for p in paths:
+        try:
+            report = json.loads(p.read_text(encoding="utf-8"))
+        except OSError as e:
+            msg = f"cannot read shard report {p}: {e.strerror or e}"
+            raise ValueError(msg) from None
+        except ValueError as e:
+            msg = f"shard report {p} is not valid JSON: {e}"
+            raise ValueError(msg) from None
+        if not isinstance(report, dict):
+            msg = f"shard report {p} is not a JSON object"
+            raise ValueError(msg)
+        reports.append(report)
+    return reports
+
+
+def _check_complete(reports: List[Dict[str, Any]]) -> List[str]:
+    errors: List[str] = []
+    shards = [r.get("shard") for r in reports]
+    if any(s is None for s in shards):
+        return ["input report was not produced with --shard"]
+
+    counts = {s["count"] for s in shards}
+    if len(counts) != 1:
+        return [f"shard counts disagree: {sorted(counts)}"]
+    count = counts.pop()
+
+    seen = sorted(s["index"] for s in shards)
+    missing = sorted(set(range(1, count + 1)) - set(seen))
+    dupes = sorted({i for i in seen if seen.count(i) > 1})
+    if missing:
+        errors.append(f"missing shards: {missing} of {count}")
+    if dupes:
+        errors.append(f"duplicate shards: {dupes}")
+    return errors
+
+
+def merge_reports(kind: str, reports: List[Dict[str, Any]]) -> Dict[str, Any]:
+    merged: Dict[str, Any] = {}
+    for key in HEADER_KEYS[kind]:
+        values = {json.dumps(r.get(key), sort_keys=True) for r in reports}
+        if len(values) != 1:
+            raise ValueError(f"shards disagree on {key!r}")
+        merged[key] = reports[0].get(key)
+    merged["findings"] = sort_findings(f for r in reports for f in r.get("findings", []))
+    stats = [r.get("stats") or {} for r in reports]
+    merged["stats"] = {
+        "files_scanned": sum(int(s.get("files_scanned") or 0) for s in stats),
+        # Shards run in parallel: the merged run took as long as its slowest shard.
+        "elapsed_s": max(float(s.get("elapsed_s") or 0.0) for s in stats),
+    }
+    return merged
+
+
+def print_timings(reports: List[Dict[str, Any]]) -> None:
+    ordered = sorted(reports, key=lambda r: r["shard"]["index"])
+    times = [float((r.get("stats") or {}).get("elapsed_s") or 0.0) for r in ordered]
+    mean = sum(times) / len(times) if times else 0.0
+
+    print("Shard timings:")
+    for r, elapsed in zip(ordered, times, strict=True):
+        shard, stats = r["shard"], r.get("stats") or {}
+        print(
+            f" - shard {shard['index']}/{shard['count']}: {stats.get('files_scanned', 0)} files "
+            f"in {elapsed:.3f}s"
+        )
+    if mean > 0:
+        print(f"   skew: max/mean = {max(times) / mean:.2f}")
+
+
+def _apply_policy(kind: str, merged: Dict[str, Any]) -> int:
+    if kind == "secret":
+        return secret_scan_redacted.run_policy(merged)
+    findings = [token_storage_scan.Finding(**f) for f in merged["findings"]]
+    return token_storage_scan.report_findings(findings)
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("kind", choices=sorted(HEADER_KEYS))
+    ap.add_argument("shards", nargs="+", type=Path)
+    ap.add_argument("--json-out", help="Write the merged report here")
+    ap.add_argument("--no-enforce", action="store_true", help="Merge only; skip the policy check")
+    args = ap.parse_args()
+
+    try:
+        reports = _load(args.shards)
+    except ValueError as e:
+        _fail(str(e))
+        return 2
+    errors = _check_complete(reports)
+    if errors:
+        for e in errors:
+            _fail(e)
+        return 2
+
+    try:
+        merged = merge_reports(args.kind, reports)
+    except ValueError as e:
+        _fail(str(e))
+        return 2
+
+    if args.json_out:
+        Path(args.json_out).write_text(
+            json.dumps(merged, indent=2, sort_keys=True) + "\n", encoding="utf-8"
+        )
+
+    print_timings(reports)
+    if args.no_enforce:
+        return 0
+    return _apply_policy(args.kind, merged)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
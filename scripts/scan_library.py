@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Importable entry point for the repo scanners' rules (no argv, no disk, no roots).
+
+Backends that need to vet uploads before ingestion call these directly
+instead of spawning the CLI scripts:
+
+    import sys; sys.path.insert(0, "scripts")
+    from scan_library import scan_bytes
+
+    findings = scan_bytes("config/app.env.json", payload)
+
+Each finding is a plain dict tagged with the `scanner` that produced it.
+Secret findings never carry the matched value (only key name and length).
+Archives (apk/aab/ipa/zip/tar) are streamed member-by-member in memory, up
+to MAX_DECOMPRESSED_BYTES per upload.
+"""
+
+from __future__ import annotations
+
+import io
+from dataclasses import asdict
+from typing import Any, BinaryIO, Dict, Iterable, List, Sequence, Tuple
+
+import secret_scan_redacted
+import token_storage_scan
+from scan_sharding import sort_findings
+
+SCANNERS: Tuple[str, ...] = ("secret", "token_storage")
+# Uploads are untrusted: cap the bytes one archive may decompress (all members, all levels).
+MAX_DECOMPRESSED_BYTES = 64_000_000
+
+
+def validate_scanners(scanners: Iterable[str]) -> Tuple[str, ...]:
+    selected = tuple(scanners)
+    unknown = sorted(set(selected) - set(SCANNERS))
+    if unknown:
+        raise ValueError(f"unknown scanner(s): {unknown} (expected a subset of {list(SCANNERS)})")
+    return selected
+
+
+def scan_stream(
+    name: str, stream: BinaryIO, scanners: Sequence[str] = SCANNERS
+) -> List[Dict[str, Any]]:
+    """Scan a seekable byte stream; `name` is reported as the finding's file.
+
+    Archives that decompress past MAX_DECOMPRESSED_BYTES stop there and report
+    an `archive_truncated` finding.
+    """
+    selected = validate_scanners(scanners)
+    out: List[Dict[str, Any]] = []
+
+    if "secret" in selected:
+        stream.seek(0)
+        out.extend(
+            {"scanner": "secret", **asdict(f)}
+            for f in secret_scan_redacted.scan_stream(
+                name, stream, secret_scan_redacted.DecompressionBudget(MAX_DECOMPRESSED_BYTES)
+            )
+        )
+
+    if "token_storage" in selected and token_storage_scan.is_source_name(name):
+        stream.seek(0)
+        head = stream.read(secret_scan_redacted.MAX_MEMBER_BYTES)
+        text = head.decode("utf-8", errors="replace")
+        out.extend(
+            {"scanner": "token_storage", **asdict(f)}
+            for f in token_storage_scan.scan_text(name, text)
+        )
+
+    return sort_findings(out)
+
+
+def scan_bytes(name: str, data: bytes, scanners: Sequence[str] = SCANNERS) -> List[Dict[str, Any]]:
+    return scan_stream(name, io.BytesIO(data), scanners)
+
+
+def scan_many(items: Iterable[Tuple[str, bytes, Sequence[str]]]) -> List[List[Dict[str, Any]]]:
+    """Scan several (name, data, scanners) uploads in one call; one result list per item.
+
+    This is the unit of work a pooled worker runs for a request batch.
+    """
+    return [scan_bytes(name, data, scanners) for name, data, scanners in items]
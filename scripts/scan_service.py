@@ -0,0 +1,469 @@
+#!/usr/bin/env python3
+"""
+Local HTTP scan service over scan_library (FastAPI + warm process pool).
+
+Uploads are queued, grouped into micro-batches (up to --max-batch items or
+--max-wait-ms, split so a burst spreads across all workers), and each batch
+runs as one task on a pre-warmed ProcessPoolExecutor, so regex compilation
+and imports are paid once per worker rather than once per upload. Large
+uploads run alone; archives stop at scan_library.MAX_DECOMPRESSED_BYTES and
+batches at --scan-timeout-s, and a pool whose worker died or hung is replaced.
+Latency and throughput are exposed on /v1/metrics.
+
+Usage:
+    python scripts/scan_service.py serve --port 8787 --workers 4
+    curl --data-binary @app.apk "http://127.0.0.1:8787/v1/scan?name=app.apk"
+    python scripts/scan_service.py bench --url http://127.0.0.1:8787 path/to/files...
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import collections
+import json
+import math
+import os
+import sys
+import threading
+import time
+import urllib.parse
+import urllib.request
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, AsyncIterator, Deque, Dict, List, Optional, Sequence, Set
+
+import scan_library
+
+try:
+    from fastapi import FastAPI, HTTPException, Query, Request
+    from pydantic import BaseModel
+except ImportError:  # pragma: no cover - the CLI scanners must keep working without FastAPI
+    FastAPI = None  # type: ignore[assignment,misc]
+    BaseModel = object  # type: ignore[assignment,misc]
+
+DEFAULT_WORKERS = max(1, (os.cpu_count() or 2) - 1)
+DEFAULT_MAX_BATCH = 16
+DEFAULT_MAX_WAIT_MS = 5.0
+MAX_UPLOAD_BYTES = 64_000_000
+MAX_BATCH_BYTES = 32_000_000
+LARGE_ITEM_BYTES = 4_000_000
+DEFAULT_SCAN_TIMEOUT_S = 60.0
+LATENCY_WINDOW = 10_000
+THROUGHPUT_WINDOW_S = 60.0
+
+
+def _warm_worker() -> None:
+    # Touch the rule modules so the first real batch does not pay for imports.
+    scan_library.scan_bytes("warmup.ts", b"const x = 1;\n")
+
+
+def _ping() -> int:
+    return os.getpid()
+
+
+@dataclass
+class ScanMetrics:
+    """Rolling request latency/throughput and batch-size counters."""
+
+    started: float = field(default_factory=time.monotonic)
+    requests: int = 0
+    errors: int = 0
+    bytes_in: int = 0
+    batches: int = 0
+    batched_items: int = 0
+    pool_restarts: int = 0
+    timeouts: int = 0
+    latencies_ms: Deque[float] = field(
+        default_factory=lambda: collections.deque(maxlen=LATENCY_WINDOW)
+    )
+    completions: Deque[float] = field(default_factory=collections.deque)
+
+    def record_request(self, elapsed_ms: float, size: int, ok: bool = True) -> None:
+        now = time.monotonic()
+        self.requests += 1
+        self.bytes_in += size
+        if not ok:
+            self.errors += 1
+        self.latencies_ms.append(elapsed_ms)
+        self.completions.append(now)
+        while self.completions and now - self.completions[0] > THROUGHPUT_WINDOW_S:
+            self.completions.popleft()
+
+    def record_batch(self, size: int) -> None:
+        self.batches += 1
+        self.batched_items += size
+
+    def snapshot(self) -> Dict[str, Any]:
+        lat = sorted(self.latencies_ms)
+
+        def pct(q: float) -> Optional[float]:
+            if not lat:
+                return None
+            return round(lat[min(len(lat) - 1, int(q * len(lat)))], 3)
+
+        uptime = time.monotonic() - self.started
+        window = min(uptime, THROUGHPUT_WINDOW_S) or 1.0
+        return {
+            "uptime_s": round(uptime, 3),
+            "requests": self.requests,
+            "errors": self.errors,
+            "bytes_in": self.bytes_in,
+            "throughput_rps": round(len(self.completions) / window, 3),
+            "latency_ms": {
+                "p50": pct(0.50),
+                "p95": pct(0.95),
+                "p99": pct(0.99),
+                "max": lat[-1] if lat else None,
+            },
+            "batches": self.batches,
+            "mean_batch_size": (
+                round(self.batched_items / self.batches, 3) if self.batches else None
+            ),
+            "pool_restarts": self.pool_restarts,
+            "timeouts": self.timeouts,
+        }
+
+
+class ScanResponse(BaseModel):  # type: ignore[misc,valid-type]
+    name: str
+    findings: List[Dict[str, Any]]
+    elapsed_ms: float
+
+
+@dataclass
+class _Pending:
+    name: str
+    data: bytes
+    scanners: Sequence[str]
+    future: "asyncio.Future[List[Dict[str, Any]]]"
+
+
+class MicroBatcher:
+    """Coalesce concurrent scan requests into batches for the worker pool.
+
+    Batches are sized to spread the queue across all workers (about
+    ceil(queued / workers) items each), and uploads over LARGE_ITEM_BYTES
+    always run alone so one big artifact never holds up small ones. The
+    batcher owns the process pool and replaces it if a worker dies.
+    """
+
+    def __init__(
+        self,
+        metrics: ScanMetrics,
+        workers: int = DEFAULT_WORKERS,
+        max_batch: int = DEFAULT_MAX_BATCH,
+        max_wait_ms: float = DEFAULT_MAX_WAIT_MS,
+        max_in_flight: Optional[int] = None,
+        scan_timeout_s: float = DEFAULT_SCAN_TIMEOUT_S,
+    ) -> None:
+        self._metrics = metrics
+        self._scan_timeout_s = scan_timeout_s
+        self._workers = workers
+        self._max_batch = max_batch
+        self._max_wait_s = max_wait_ms / 1000.0
+        self._queue: "asyncio.Queue[_Pending]" = asyncio.Queue()
+        self._carry: Optional[_Pending] = None
+        self._slots = asyncio.Semaphore(max_in_flight or workers * 2)
+        self._tasks: Set["asyncio.Task[None]"] = set()
+        self._runner: Optional["asyncio.Task[None]"] = None
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pool_lock = asyncio.Lock()
+
+    async def _new_pool(self) -> ProcessPoolExecutor:
+        pool = ProcessPoolExecutor(max_workers=self._workers, initializer=_warm_worker)
+        loop = asyncio.get_running_loop()
+        # Spin every worker up before it takes traffic.
+        await asyncio.gather(*(loop.run_in_executor(pool, _ping) for _ in range(self._workers)))
+        return pool
+
+    async def start(self) -> None:
+        self._pool = await self._new_pool()
+        self._runner = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            self._runner.cancel()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+
+    async def submit(self, name: str, data: bytes, scanners: Sequence[str]) -> List[Dict[str, Any]]:
+        fut: "asyncio.Future[List[Dict[str, Any]]]" = asyncio.get_running_loop().create_future()
+        await self._queue.put(_Pending(name=name, data=data, scanners=tuple(scanners), future=fut))
+        return await fut
+
+    def _batch_cap(self, collected: int) -> int:
+        # Leave work for the other workers instead of serialising a burst on one.
+        queued = collected + self._queue.qsize()
+        return max(1, min(self._max_batch, math.ceil(queued / self._workers)))
+
+    async def _collect(self) -> List[_Pending]:
+        loop = asyncio.get_running_loop()
+        first, self._carry = self._carry, None
+        batch = [first if first is not None else await self._queue.get()]
+        size = len(batch[0].data)
+        if size > LARGE_ITEM_BYTES:
+            return batch
+        deadline = loop.time() + self._max_wait_s
+        while len(batch) < self._batch_cap(len(batch)) and size < MAX_BATCH_BYTES:
+            timeout = deadline - loop.time()
+            try:
+                if timeout <= 0:
+                    item = self._queue.get_nowait()
+                else:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+            except (asyncio.QueueEmpty, asyncio.TimeoutError):
+                break
+            if len(item.data) > LARGE_ITEM_BYTES:
+                self._carry = item
+                break
+            batch.append(item)
+            size += len(item.data)
+        return batch
+
+    async def _run(self) -> None:
+        while True:
+            batch = await self._collect()
+            await self._slots.acquire()
+            task = asyncio.create_task(self._dispatch(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _replace_pool(self, old: ProcessPoolExecutor, reason: str) -> None:
+        async with self._pool_lock:
+            if self._pool is not old:
+                return  # another batch already replaced it
+            print(f"scan_service: worker pool {reason}; restarting", file=sys.stderr)
+            # A hung scan never returns on its own; shutdown() alone would wait for it.
+            for proc in list((getattr(old, "_processes", None) or {}).values()):
+                proc.terminate()
+            old.shutdown(wait=False, cancel_futures=True)
+            self._pool = await self._new_pool()
+            self._metrics.pool_restarts += 1
+
+    async def _scan(self, batch: List[_Pending], retry: bool) -> None:
+        loop = asyncio.get_running_loop()
+        pool = self._pool
+        try:
+            results = await asyncio.wait_for(
+                loop.run_in_executor(
+                    pool, scan_library.scan_many, [(p.name, p.data, p.scanners) for p in batch]
+                ),
+                self._scan_timeout_s,
+            )
+            for p, r in zip(batch, results):
+                if not p.future.done():
+                    p.future.set_result(r)
+        except (BrokenProcessPool, TimeoutError) as e:
+            assert pool is not None
+            timed_out = isinstance(e, TimeoutError)
+            if timed_out:
+                self._metrics.timeouts += 1
+            await self._replace_pool(pool, "timed out" if timed_out else "broken")
+            if retry:
+                # The crash or hang may have come from any upload on the old pool:
+                # retry each once on its own so only a genuinely bad one fails.
+                await asyncio.gather(*(self._scan([p], retry=False) for p in batch))
+            else:
+                for p in batch:
+                    if not p.future.done():
+                        p.future.set_exception(e)
+        except Exception as e:
+            for p in batch:
+                if not p.future.done():
+                    p.future.set_exception(e)
+
+    async def _dispatch(self, batch: List[_Pending]) -> None:
+        try:
+            await self._scan(batch, retry=True)
+        finally:
+            self._metrics.record_batch(len(batch))
+            self._slots.release()
+
+
+async def _read_upload(request: "Request") -> bytes:
+    """Read the request body, rejecting it as soon as it exceeds MAX_UPLOAD_BYTES."""
+    declared = request.headers.get("content-length")
+    if declared is not None:
+        try:
+            declared_len = int(declared)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="invalid Content-Length") from None
+        if declared_len > MAX_UPLOAD_BYTES:
+            raise HTTPException(status_code=413, detail=f"upload exceeds {MAX_UPLOAD_BYTES} bytes")
+
+    buf = bytearray()
+    async for chunk in request.stream():
+        buf += chunk
+        if len(buf) > MAX_UPLOAD_BYTES:
+            raise HTTPException(status_code=413, detail=f"upload exceeds {MAX_UPLOAD_BYTES} bytes")
+    return bytes(buf)
+
+
+def create_app(
+    workers: int = DEFAULT_WORKERS,
+    max_batch: int = DEFAULT_MAX_BATCH,
+    max_wait_ms: float = DEFAULT_MAX_WAIT_MS,
+    scan_timeout_s: float = DEFAULT_SCAN_TIMEOUT_S,
+) -> "FastAPI":
+    if FastAPI is None:
+        raise RuntimeError("scan_service requires FastAPI (pip install fastapi uvicorn)")
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+        metrics = ScanMetrics()
+        batcher = MicroBatcher(
+            metrics,
+            workers=workers,
+            max_batch=max_batch,
+            max_wait_ms=max_wait_ms,
+            scan_timeout_s=scan_timeout_s,
+        )
+        # Workers are spun up before accepting traffic.
+        await batcher.start()
+        app.state.metrics = metrics
+        app.state.batcher = batcher
+        try:
+            yield
+        finally:
+            await batcher.stop()
+
+    app = FastAPI(title="Cerebral mobile scan service", lifespan=lifespan)
+
+    @app.get("/healthz")
+    async def healthz() -> Dict[str, str]:
+        return {"status": "ok"}
+
+    @app.get("/v1/metrics")
+    async def metrics() -> Dict[str, Any]:
+        return app.state.metrics.snapshot()
+
+    @app.post("/v1/scan", response_model=ScanResponse)
+    async def scan(
+        request: Request,
+        name: str = Query(
+            ..., min_length=1, description="Upload file name; drives archive/source detection"
+        ),
+        scanners: str = Query(",".join(scan_library.SCANNERS)),
+    ) -> ScanResponse:
+        started = time.perf_counter()
+        selected = [s for s in scanners.split(",") if s]
+        try:
+            scan_library.validate_scanners(selected)
+        except ValueError as e:
+            raise HTTPException(status_code=422, detail=str(e)) from None
+
+        data = await _read_upload(request)
+
+        ok = False
+        try:
+            findings = await app.state.batcher.submit(name, data, selected)
+            ok = True
+        except TimeoutError:
+            raise HTTPException(status_code=504, detail="scan timed out") from None
+        finally:
+            elapsed_ms = (time.perf_counter() - started) * 1000.0
+            app.state.metrics.record_request(elapsed_ms, len(data), ok=ok)
+        return ScanResponse(name=name, findings=findings, elapsed_ms=round(elapsed_ms, 3))
+
+    return app
+
+
+def _bench(url: str, files: List[Path], concurrency: int, rounds: int) -> int:
+    payloads = [(p.name, p.read_bytes()) for p in files if p.is_file()]
+    if not payloads:
+        print("bench: no readable input files", file=sys.stderr)
+        return 2
+
+    lock = threading.Lock()
+    latencies: List[float] = []
+    failures = 0
+
+    def one(item: tuple) -> None:
+        nonlocal failures
+        name, data = item
+        req = urllib.request.Request(
+            f"{url.rstrip('/')}/v1/scan?{urllib.parse.urlencode({'name': name})}",
+            data=data,
+            headers={"Content-Type": "application/octet-stream"},
+            method="POST",
+        )
+        t0 = time.perf_counter()
+        try:
+            with urllib.request.urlopen(req, timeout=120) as resp:
+                resp.read()
+            ok = True
+        except Exception:
+            ok = False
+        with lock:
+            latencies.append((time.perf_counter() - t0) * 1000.0)
+            if not ok:
+                failures += 1
+
+    work = payloads * rounds
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as ex:
+        list(ex.map(one, work))
+    wall = time.perf_counter() - t0
+
+    latencies.sort()
+    print(f"requests: {len(work)}  failures: {failures}  concurrency: {concurrency}")
+    print(f"throughput: {len(work) / wall:.1f} req/s  ({wall:.3f}s wall)")
+    for q in (0.50, 0.95, 0.99):
+        value = latencies[min(len(latencies) - 1, int(q * len(latencies)))]
+        print(f"p{int(q * 100)}: {value:.2f} ms")
+    with urllib.request.urlopen(f"{url.rstrip('/')}/v1/metrics", timeout=10) as resp:
+        print("server:", json.dumps(json.loads(resp.read()), sort_keys=True))
+    return 1 if failures else 0
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    sub = ap.add_subparsers(dest="cmd", required=True)
+
+    serve = sub.add_parser("serve", help="Run the scan service locally (uvicorn)")
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=8787)
+    serve.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="Scan worker processes")
+    serve.add_argument("--max-batch", type=int, default=DEFAULT_MAX_BATCH)
+    serve.add_argument("--max-wait-ms", type=float, default=DEFAULT_MAX_WAIT_MS)
+    serve.add_argument(
+        "--scan-timeout-s",
+        type=float,
+        default=DEFAULT_SCAN_TIMEOUT_S,
+        help="Per-batch worker time limit; a batch that exceeds it gets a fresh pool",
+    )
+
+    bench = sub.add_parser("bench", help="Load-test a running instance with local files")
+    bench.add_argument("files", nargs="+", type=Path)
+    bench.add_argument("--url", default="http://127.0.0.1:8787")
+    bench.add_argument("--concurrency", type=int, default=16)
+    bench.add_argument("--rounds", type=int, default=10)
+
+    args = ap.parse_args()
+
+    if args.cmd == "bench":
+        return _bench(args.url, args.files, args.concurrency, args.rounds)
+
+    try:
+        import uvicorn
+    except ImportError:
+        print("scan_service serve requires uvicorn (pip install uvicorn)", file=sys.stderr)
+        return 2
+    app = create_app(
+        workers=args.workers,
+        max_batch=args.max_batch,
+        max_wait_ms=args.max_wait_ms,
+        scan_timeout_s=args.scan_timeout_s,
+    )
+    uvicorn.run(app, host=args.host, port=args.port, log_level="info")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
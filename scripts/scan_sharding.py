@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Deterministic file sharding shared by the repo scanners.
+
+`--shard i/N` (1-based) assigns every file to exactly one of N shards using a
+stable hash of its repo-relative POSIX path, so CI matrix jobs split the tree
+reproducibly regardless of filesystem walk order or runner.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+
+@dataclass(frozen=True)
+class Shard:
+    index: int  # 1-based
+    count: int
+
+    def owns(self, rel_path: str) -> bool:
+        return shard_of(rel_path, self.count) == self.index
+
+    def to_json(self) -> Dict[str, int]:
+        return {"index": self.index, "count": self.count}
+
+
+def parse_shard(spec: Optional[str]) -> Optional[Shard]:
+    """Parse `i/N` into a Shard; None/empty means "no sharding"."""
+    if not spec:
+        return None
+    try:
+        idx_s, count_s = spec.split("/", 1)
+        idx, count = int(idx_s), int(count_s)
+    except ValueError:
+        raise ValueError(f"invalid shard spec {spec!r} (expected i/N, e.g. 2/4)") from None
+    if count < 1 or not 1 <= idx <= count:
+        raise ValueError(f"invalid shard spec {spec!r} (need 1 <= i <= N)")
+    return Shard(index=idx, count=count)
+
+
+def shard_of(rel_path: str, count: int) -> int:
+    """Stable 1-based shard number for a repo-relative path."""
+    norm = rel_path.replace("\\", "/").lstrip("/")
+    digest = hashlib.blake2b(norm.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big") % count + 1
+
+
+def finding_sort_key(f: Dict[str, Any]) -> Tuple[str, int, str, str]:
+    """Canonical ordering so single-job and merged findings are byte-identical."""
+    return (
+        str(f.get("file") or ""),
+        int(f.get("line") or 0),
+        str(f.get("category") or f.get("kind") or ""),
+        json.dumps(f, sort_keys=True),
+    )
+
+
+def sort_findings(findings: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    return sorted(findings, key=finding_sort_key)
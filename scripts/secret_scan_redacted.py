@@ -9,13 +9,22 @@ No secret values are ever printed.
 from __future__ import annotations
 
 import argparse
+import hashlib
+import io
 import json
 import os
 import re
+import subprocess
 import sys
-from dataclasses import asdict, dataclass
-from pathlib import Path
-from typing import Iterable, List, Optional
+import tarfile
+import time
+import zipfile
+from dataclasses import asdict, dataclass, replace
+from pathlib import Path, PurePosixPath
+from typing import Any, BinaryIO, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple, Union
+
+from scan_sharding import Shard, parse_shard, sort_findings
+from workspace_graph import ScanScope, add_scope_args, changed_from_args, scope_for
 
 
 SKIP_DIRS = {
@@ -26,6 +35,7 @@ SKIP_DIRS = {
     "dist",
     "build",
     "coverage",
+    ".scan-cache",
 }
 
 MAX_FILE_BYTES = 2_000_000
@@ -54,6 +64,44 @@ BEGIN_PRIVATE_KEY_RE = re.compile(r"-----BEGIN (?:RSA |EC |OPENSSH |)PRIVATE KEY
 GITHUB_PAT_RE = re.compile(r"\b(ghp_[A-Za-z0-9]{20,}|github_pat_[A-Za-z0-9_]{20,})\b")
 SLACK_TOKEN_RE = re.compile(r"\b(xox[baprs]-[A-Za-z0-9-]{10,})\b")
 
+# Build artifacts (APK/AAB/IPA are zips) are streamed member-by-member, never extracted.
+ZIP_SUFFIXES = (".apk", ".aab", ".ipa", ".zip", ".jar", ".aar")
+TAR_SUFFIXES = (".tar", ".tgz", ".tar.gz", ".tar.bz2", ".tar.xz")
+ARCHIVE_SUFFIXES = ZIP_SUFFIXES + TAR_SUFFIXES
+ARCHIVE_MEMBER_SEP = "!"
+MAX_ARCHIVE_DEPTH = 4
+MAX_ARCHIVE_MEMBERS = 200_000
+MAX_MEMBER_BYTES = 64_000_000
+MAX_LINE_BYTES = 64 * 1024
+LINE_OVERLAP_BYTES = 512
+STREAM_CHUNK_BYTES = 64 * 1024
+# Binary members whose string tables are worth scanning (Hermes/Metro bundles, dex).
+BUNDLE_MEMBER_RE = re.compile(r"\.(bundle|jsbundle|hbc|dex)$", re.IGNORECASE)
+PRINTABLE_BYTES = frozenset(range(0x20, 0x7F)) | {0x09}
+PRINTABLE_RUN_RE = re.compile(rb"[\x20-\x7e\t]{8,}")
+PRINTABLE_PREFIX_RE = re.compile(rb"[\x20-\x7e\t]*")
+
+
+# CI policy (applied once, after any shard merge).
+POLICY_ALLOW_PREFIXES = (
+    "docs/",
+    "scripts/",
+)
+POLICY_ALLOW_EXACT = {
+    "docs/SECURITY_SECRET_SCAN_REPORT_2025_12_21.md",
+}
+POLICY_HARD_FAIL_CATEGORIES = {
+    "private_key_block",
+    "key_material_file",
+    "credential_json_file",
+    "github_pat_like",
+    "slack_token_like",
+}
+# Content the scanner could not read (or only partly read) is never treated as clean.
+POLICY_UNREADABLE_CATEGORIES = {"archive_unreadable", "archive_truncated", "content_unreadable"}
+POLICY_INLINE_ENFORCED_PREFIXES = ("frontend-react-native/src/", "apps/", "packages/")
+POLICY_INLINE_IGNORED_TOKENS = ("/__tests__/", ".test.", ".spec.")
+
 
 @dataclass(frozen=True)
 class Finding:
@@ -63,12 +111,19 @@ class Finding:
     key: Optional[str] = None
     value_len: Optional[int] = None
     note: Optional[str] = None
+    # Hash of the line with secret-shaped values masked (stable cross-run identity).
+    line_hash: Optional[str] = None
 
 
-def _iter_files(root: Path) -> Iterable[Path]:
+def iter_files(root: Path, scope: Optional[ScanScope] = None) -> Iterable[Path]:
     for dirpath, dirnames, filenames in os.walk(root):
-        dirnames[:] = [d for d in dirnames if d not in SKIP_DIRS]
-        for fn in filenames:
+        dirnames[:] = sorted(d for d in dirnames if d not in SKIP_DIRS)
+        if scope is not None:
+            rel_dir = Path(dirpath).relative_to(root).as_posix()
+            dirnames[:] = [
+                d for d in dirnames if scope.may_contain(f"{rel_dir}/{d}" if rel_dir != "." else d)
+            ]
+        for fn in sorted(filenames):
             yield Path(dirpath) / fn
 
 
@@ -81,25 +136,383 @@ def _is_probably_binary(p: Path) -> bool:
         return True
 
 
-def scan_repo(root: Path) -> List[Finding]:
+def _is_archive_name(name: str) -> bool:
+    return name.lower().endswith(ARCHIVE_SUFFIXES)
+
+
+def scan_name(rel: str, name: str) -> List[Finding]:
+    """Filename rules (dotenv / key material / credential json)."""
+    out: List[Finding] = []
+    rel_norm = "/" + rel.replace("\\", "/")
+
+    if DOTENV_NAME_RE.search(rel_norm):
+        out.append(Finding(category="dotenv_file", file=rel))
+
+    if KEY_FILE_RE.search(name):
+        out.append(Finding(category="key_material_file", file=rel))
+
+    if CRED_JSON_RE.search(name):
+        out.append(Finding(category="credential_json_file", file=rel))
+
+    return out
+
+
+def redact_line(line: str) -> str:
+    """Mask secret-shaped values and normalise whitespace; safe to hash or log."""
+    line = ASSIGNMENT_RE.sub(lambda m: f"{m.group('key')}=<redacted>", line)
+    line = GITHUB_PAT_RE.sub("<redacted>", line)
+    line = SLACK_TOKEN_RE.sub("<redacted>", line)
+    line = BEGIN_PRIVATE_KEY_RE.sub("<redacted>", line)
+    return " ".join(line.split())
+
+
+def line_hash(line: str) -> str:
+    return hashlib.blake2b(redact_line(line).encode("utf-8"), digest_size=16).hexdigest()
+
+
+def _scan_lines(rel: str, lines: Iterable[Tuple[int, str]]) -> List[Finding]:
+    """Content rules over (line_number, text) pairs."""
+    out: List[Finding] = []
+    for i, line in lines:
+        if BEGIN_PRIVATE_KEY_RE.search(line):
+            out.append(Finding(category="private_key_block", file=rel, line=i, line_hash=line_hash(line)))
+            break
+
+        m = ASSIGNMENT_RE.search(line)
+        if m:
+            out.append(
+                Finding(
+                    category="inline_secret_assignment",
+                    file=rel,
+                    line=i,
+                    key=m.group("key").lower(),
+                    value_len=len(m.group("val")),
+                    line_hash=line_hash(line),
+                )
+            )
+
+        if GITHUB_PAT_RE.search(line):
+            out.append(Finding(category="github_pat_like", file=rel, line=i, line_hash=line_hash(line)))
+        if SLACK_TOKEN_RE.search(line):
+            out.append(Finding(category="slack_token_like", file=rel, line=i, line_hash=line_hash(line)))
+    return out
+
+
+def _iter_stream_lines(stream: BinaryIO, limit: int) -> Iterator[Tuple[int, str]]:
+    """Numbered lines from a byte stream, never buffering more than MAX_LINE_BYTES.
+
+    Overlong lines (minified bundles) are yielded as windows of the same line
+    number; each window repeats the tail of the previous one so a token that
+    straddles the boundary is still matched.
+    """
+    lineno = 1
+    carry = b""
+    remaining = limit
+    while remaining > 0:
+        raw = stream.readline(min(MAX_LINE_BYTES, remaining))
+        if not raw:
+            break
+        remaining -= len(raw)
+        yield lineno, (carry + raw).decode("utf-8", errors="ignore")
+        if raw.endswith(b"\n"):
+            lineno += 1
+            carry = b""
+        else:
+            carry = raw[-LINE_OVERLAP_BYTES:]
+
+
+def _iter_binary_strings(stream: BinaryIO, limit: int) -> Iterator[Tuple[int, str]]:
+    """(byte_offset, text) for printable runs in a binary stream (Hermes bytecode, dex).
+
+    Runs longer than MAX_LINE_BYTES are yielded as windows that share the run's
+    offset and repeat the previous window's tail, as `_iter_stream_lines` does
+    for overlong lines.
+    """
+    buf = b""
+    offset = 0
+    remaining = limit
+    carry = b""  # tail of a run cut at the previous window boundary
+    carry_start = 0
+    while True:
+        chunk = stream.read(min(STREAM_CHUNK_BYTES, remaining)) if remaining > 0 else b""
+        remaining -= len(chunk)
+        buf += chunk
+
+        # Hold back a trailing printable run; it may continue in the next chunk.
+        split = len(buf)
+        if chunk:
+            while split > 0 and buf[split - 1] in PRINTABLE_BYTES and len(buf) - split < MAX_LINE_BYTES:
+                split -= 1
+            if split == 0:
+                continue
+        cut = bool(chunk) and split < len(buf) and buf[split - 1] in PRINTABLE_BYTES
+
+        pos = 0
+        if carry:
+            head = PRINTABLE_PREFIX_RE.match(buf, 0, split)
+            window = carry + head.group()
+            pos = head.end()
+            yield carry_start, window.decode("ascii")
+            carry = window[-LINE_OVERLAP_BYTES:] if cut and pos == split else b""
+
+        last = None
+        for m in PRINTABLE_RUN_RE.finditer(buf, pos, split):
+            yield offset + m.start(), m.group().decode("ascii")
+            last = m
+
+        if cut and not carry:
+            if last is not None and last.end() == split:
+                carry_start, carry = offset + last.start(), last.group()[-LINE_OVERLAP_BYTES:]
+            else:
+                # Too short to have matched on its own; still the head of the cut run.
+                run = split
+                while run > pos and buf[run - 1] in PRINTABLE_BYTES:
+                    run -= 1
+                carry_start, carry = offset + run, buf[run:split]
+
+        buf = buf[split:]
+        offset += split
+        if not chunk:
+            break
+
+
+def _dedupe(findings: Iterable[Finding]) -> List[Finding]:
+    # Overlapping windows of one line can match the same token twice; like the
+    # plain-file scan, keep one finding per category per line.
+    out: Dict[Tuple[str, Optional[int], Optional[str]], Finding] = {}
+    for f in findings:
+        out.setdefault((f.category, f.line, f.note), f)
+    return list(out.values())
+
+
+def _truncated(rel: str, limit: str) -> Finding:
+    return Finding(category="archive_truncated", file=rel, note=limit)
+
+
+def _scan_member(rel: str, name: str, stream: BinaryIO) -> List[Finding]:
+    head = stream.read(2048)
+    stream.seek(0)
+
+    if b"\x00" not in head:
+        findings = _dedupe(_scan_lines(rel, _iter_stream_lines(stream, MAX_MEMBER_BYTES)))
+    elif BUNDLE_MEMBER_RE.search(name):
+        findings = _dedupe(
+            replace(f, line=None, note=f"byte_offset={f.line}")
+            for f in _scan_lines(rel, _iter_binary_strings(stream, MAX_MEMBER_BYTES))
+        )
+    else:
+        return []
+
+    # Bytes past the cap were never looked at; say so instead of scanning clean.
+    if stream.read(1):
+        findings.append(_truncated(rel, f"max_member_bytes={MAX_MEMBER_BYTES}"))
+    return findings
+
+
+def _iter_archive_members(
+    src: Union[Path, BinaryIO], name: str
+) -> Iterator[Tuple[str, Callable[[], BinaryIO]]]:
+    """Yield (name, opener) for regular members of a zip (apk/aab/ipa/jar) or tar archive.
+
+    Members are opened lazily so a corrupt member fails on its own; nothing touches disk.
+    """
+    if name.lower().endswith(ZIP_SUFFIXES):
+        with zipfile.ZipFile(src) as zf:
+            for info in zf.infolist():
+                if info.is_dir():
+                    continue
+                yield info.filename, lambda info=info: zf.open(info)
+        return
+
+    if isinstance(src, Path):
+        tf = tarfile.open(src, mode="r:*")
+    else:
+        tf = tarfile.open(fileobj=src, mode="r:*")
+    with tf:
+        for ti in tf:
+            if not ti.isfile():
+                continue
+            yield ti.name, lambda ti=ti: tf.extractfile(ti)
+
+
+def _unreadable(category: str, rel: str, exc: BaseException) -> Finding:
+    kind = type(exc)
+    note = kind.__qualname__ if kind.__module__ == "builtins" else f"{kind.__module__}.{kind.__qualname__}"
+    return Finding(category=category, file=rel, note=note)
+
+
+class BudgetExceeded(Exception):
+    """Raised when an upload decompresses more bytes than its DecompressionBudget allows."""
+
+
+class DecompressionBudget:
+    """Decompressed bytes one upload may read, across all members and nesting levels."""
+
+    def __init__(self, limit: int) -> None:
+        self.limit = limit
+        self.used = 0
+        self.exhausted = False
+
+    def charge(self, n: int) -> None:
+        self.used += n
+        if self.used > self.limit:
+            self.exhausted = True
+            raise BudgetExceeded(f"decompressed more than {self.limit} bytes")
+
+
+class _MeteredStream:
+    """Member stream that charges every byte read (or seeked over) to a budget."""
+
+    def __init__(self, inner: BinaryIO, budget: DecompressionBudget) -> None:
+        self._inner = inner
+        self._budget = budget
+
+    def read(self, n: int = -1) -> bytes:
+        data = self._inner.read(n)
+        self._budget.charge(len(data))
+        return data
+
+    def readline(self, n: int = -1) -> bytes:
+        data = self._inner.readline(n)
+        self._budget.charge(len(data))
+        return data
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        before = self._inner.tell()
+        after = self._inner.seek(offset, whence)
+        # Compressed members seek by decompressing: forward from here, backward from 0.
+        self._budget.charge(after - before if after >= before else after)
+        return after
+
+    def tell(self) -> int:
+        return self._inner.tell()
+
+    def seekable(self) -> bool:
+        return True
+
+    def readable(self) -> bool:
+        return True
+
+    def close(self) -> None:
+        self._inner.close()
+
+    def __enter__(self) -> "_MeteredStream":
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+
+def scan_archive(
+    src: Union[Path, BinaryIO],
+    display: str,
+    depth: int = 0,
+    budget: Optional[DecompressionBudget] = None,
+) -> List[Finding]:
+    """Scan an archive's members in memory; findings are reported as `archive!member`.
+
+    An archive (or member) that cannot be read is reported as `archive_unreadable`,
+    and one cut short by a depth/member/size cap (or by `budget`) as
+    `archive_truncated`, rather than skipped, so a corrupt or oversized artifact
+    never scans clean.
+    """
+    findings: List[Finding] = []
+    members = _iter_archive_members(src, display)
+    count = 0
+    try:
+        while budget is None or not budget.exhausted:
+            try:
+                member_name, opener = next(members)
+            except StopIteration:
+                break
+            except BudgetExceeded:
+                findings.append(_truncated(display, f"max_decompressed_bytes={budget.limit}"))
+                break
+            except Exception as e:
+                findings.append(_unreadable("archive_unreadable", display, e))
+                break
+
+            count += 1
+            if count > MAX_ARCHIVE_MEMBERS:
+                findings.append(_truncated(display, f"max_members={MAX_ARCHIVE_MEMBERS}"))
+                break
+
+            rel = f"{display}{ARCHIVE_MEMBER_SEP}{member_name}"
+            findings.extend(scan_name(rel, PurePosixPath(member_name).name))
+            if _is_archive_name(member_name) and depth + 1 >= MAX_ARCHIVE_DEPTH:
+                findings.append(_truncated(rel, f"max_depth={MAX_ARCHIVE_DEPTH}"))
+                continue
+            try:
+                member = opener()
+                with member if budget is None else _MeteredStream(member, budget) as member:
+                    if _is_archive_name(member_name):
+                        findings.extend(scan_archive(member, rel, depth + 1, budget))
+                    else:
+                        findings.extend(_scan_member(rel, member_name, member))
+            except BudgetExceeded:
+                findings.append(_truncated(rel, f"max_decompressed_bytes={budget.limit}"))
+                break
+            except Exception as e:
+                findings.append(_unreadable("archive_unreadable", rel, e))
+    finally:
+        members.close()
+    return findings
+
+
+def scan_stream(
+    name: str, stream: BinaryIO, budget: Optional[DecompressionBudget] = None
+) -> List[Finding]:
+    """Scan one in-memory upload (file or archive) without touching disk.
+
+    `stream` must be seekable (e.g. io.BytesIO); `name` drives archive
+    detection and is what findings report as their file. `budget` caps the
+    bytes decompressed from an archive upload.
+    """
+    findings = scan_name(name, PurePosixPath(name).name)
+    if _is_archive_name(name):
+        findings.extend(scan_archive(stream, name, budget=budget))
+        return findings
+    try:
+        findings.extend(_scan_member(name, name, stream))
+    except Exception as e:
+        findings.append(_unreadable("content_unreadable", name, e))
+    return findings
+
+
+def scan_bytes(name: str, data: bytes) -> List[Finding]:
+    return scan_stream(name, io.BytesIO(data))
+
+
+def scan_file_content(rel: str, data: bytes) -> List[Finding]:
+    """Content rules for a file already read into memory (same semantics as scan_repo)."""
+    if len(data) > MAX_FILE_BYTES or b"\x00" in data[:2048]:
+        return []
+    text = io.StringIO(data.decode("utf-8", errors="ignore"), newline=None)
+    return _scan_lines(rel, enumerate(text, start=1))
+
+
+def scan_repo(
+    root: Path,
+    shard: Optional[Shard] = None,
+    stats: Optional[Dict[str, int]] = None,
+    scope: Optional[ScanScope] = None,
+) -> List[Finding]:
     findings: List[Finding] = []
 
-    for p in _iter_files(root):
+    for p in iter_files(root, scope):
         try:
             rel = str(p.relative_to(root))
         except Exception:
             continue
 
-        rel_norm = "/" + rel.replace("\\", "/")
-
-        if DOTENV_NAME_RE.search(rel_norm):
-            findings.append(Finding(category="dotenv_file", file=rel))
-
-        if KEY_FILE_RE.search(p.name):
-            findings.append(Finding(category="key_material_file", file=rel))
+        if scope is not None and not scope.includes(rel):
+            continue
+        if shard is not None and not shard.owns(rel):
+            continue
+        if stats is not None:
+            stats["files_scanned"] = stats.get("files_scanned", 0) + 1
 
-        if CRED_JSON_RE.search(p.name):
-            findings.append(Finding(category="credential_json_file", file=rel))
+        findings.extend(scan_name(rel, p.name))
 
         try:
             if p.stat().st_size > MAX_FILE_BYTES:
@@ -112,45 +525,176 @@ def scan_repo(root: Path) -> List[Finding]:
 
         try:
             with open(p, "r", encoding="utf-8", errors="ignore") as f:
-                for i, line in enumerate(f, start=1):
-                    if BEGIN_PRIVATE_KEY_RE.search(line):
-                        findings.append(Finding(category="private_key_block", file=rel, line=i))
-                        break
-
-                    m = ASSIGNMENT_RE.search(line)
-                    if m:
-                        findings.append(
-                            Finding(
-                                category="inline_secret_assignment",
-                                file=rel,
-                                line=i,
-                                key=m.group("key").lower(),
-                                value_len=len(m.group("val")),
-                            )
-                        )
-
-                    if GITHUB_PAT_RE.search(line):
-                        findings.append(Finding(category="github_pat_like", file=rel, line=i))
-                    if SLACK_TOKEN_RE.search(line):
-                        findings.append(Finding(category="slack_token_like", file=rel, line=i))
+                findings.extend(_scan_lines(rel, enumerate(f, start=1)))
         except Exception:
             continue
 
     return findings
 
 
+def _display_path(p: Path, root: Path) -> str:
+    try:
+        return p.relative_to(root).as_posix()
+    except ValueError:
+        return p.as_posix()
+
+
+def build_report(root: Path, findings: Iterable[Finding]) -> Dict[str, Any]:
+    """Report payload; findings are canonically ordered so shard merges are identical."""
+    return {"repo_root": str(root), "findings": sort_findings(asdict(f) for f in findings)}
+
+
+def write_report(path: Path, report: Dict[str, Any]) -> None:
+    path.write_text(json.dumps(report, indent=2, sort_keys=True) + "\n", encoding="utf-8")
+
+
+def _git_tracked_files(root: Path) -> Optional[Set[str]]:
+    """Tracked paths under `root`, or None when git cannot list them (not a checkout, no git)."""
+    try:
+        r = subprocess.run(
+            ["git", "ls-files", "-z"], cwd=root, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL
+        )
+    except OSError:
+        return None
+    if r.returncode != 0:
+        return None
+    return {p for p in r.stdout.decode("utf-8", errors="replace").split("\0") if p}
+
+
+def _policy_allowed(path: str) -> bool:
+    if path in POLICY_ALLOW_EXACT:
+        return True
+    return path.startswith(POLICY_ALLOW_PREFIXES)
+
+
+def enforce_policy(
+    findings: Iterable[Dict[str, Any]],
+    is_tracked: Callable[[str], bool],
+) -> List[Tuple[str, str, Optional[int]]]:
+    """Return (category, path, line) failures for risky tracked findings."""
+    failures: List[Tuple[str, str, Optional[int]]] = []
+    for f in findings:
+        path = f.get("file") or ""
+        cat = f.get("category") or ""
+        if not path:
+            continue
+
+        # Archive members (`app.apk!assets/index.android.bundle`) are build output:
+        # anything secret-shaped that shipped in an artifact fails.
+        if ARCHIVE_MEMBER_SEP in path or cat in POLICY_UNREADABLE_CATEGORIES:
+            failures.append((cat, path, f.get("line")))
+            continue
+
+        if not is_tracked(path) or _policy_allowed(path):
+            continue
+
+        if cat in POLICY_HARD_FAIL_CATEGORIES:
+            failures.append((cat, path, f.get("line")))
+            continue
+
+        if cat == "dotenv_file":
+            failures.append((cat, path, None))
+            continue
+
+        if cat == "inline_secret_assignment":
+            # Enforce in app/src trees only, but ignore test/spec fixtures.
+            if path.startswith(POLICY_INLINE_ENFORCED_PREFIXES):
+                if any(token in path for token in POLICY_INLINE_IGNORED_TOKENS):
+                    continue
+                failures.append((cat, path, f.get("line")))
+    return failures
+
+
+def run_policy(report: Dict[str, Any]) -> int:
+    root = Path(report.get("repo_root") or ".")
+    findings = report.get("findings", [])
+    tracked = _git_tracked_files(root)
+    if tracked is None:
+        # Archive and unreadable findings fail regardless; everything else is
+        # judged by tracked status, which cannot be established without git.
+        needs_git = [
+            f
+            for f in findings
+            if ARCHIVE_MEMBER_SEP not in (f.get("file") or "")
+            and f.get("category") not in POLICY_UNREADABLE_CATEGORIES
+        ]
+        if needs_git:
+            print(f"Secret scan failed: git cannot list tracked files under {root}; policy not evaluated.")
+            return 1
+        tracked = set()
+    failures = enforce_policy(findings, tracked.__contains__)
+
+    if failures:
+        print("Secret scan failed (redacted). Findings:")
+        for cat, path, line in failures[:200]:
+            loc = f"{path}" + (f":L{line}" if line else "")
+            print(f" - {cat}: {loc}")
+        return 1
+
+    print("Secret scan passed.")
+    return 0
+
+
 def main() -> int:
     ap = argparse.ArgumentParser()
-    ap.add_argument("repo_root")
+    ap.add_argument("repo_root", help="Repo checkout to walk, or a single archive (apk/aab/ipa/zip/tar)")
     ap.add_argument("--json-out", required=True)
+    ap.add_argument(
+        "--archive",
+        action="append",
+        default=[],
+        help="Also stream this build artifact (apk/aab/ipa/zip/tar) through the rules; repeatable",
+    )
+    add_scope_args(ap)
+    ap.add_argument("--shard", help="Scan only shard i of N (1-based, e.g. 2/4); merge with merge_scan_shards.py")
+    ap.add_argument("--enforce", action="store_true", help="Apply CI policy and exit non-zero on failures")
     args = ap.parse_args()
 
-    root = Path(args.repo_root).resolve()
-    findings = scan_repo(root)
-    Path(args.json_out).write_text(
-        json.dumps({"repo_root": str(root), "findings": [asdict(f) for f in findings]}, indent=2, sort_keys=True) + "\n",
-        encoding="utf-8",
-    )
+    try:
+        shard = parse_shard(args.shard)
+    except ValueError as e:
+        ap.error(str(e))
+    if args.enforce and shard is not None:
+        ap.error("--enforce applies to the full report; run it on the merged shards instead")
+
+    target = Path(args.repo_root).resolve()
+    archives = [Path(a).resolve() for a in args.archive]
+    if not target.exists():
+        ap.error(f"no such repo root or archive: {args.repo_root}")
+    if target.is_file() and not _is_archive_name(target.name):
+        ap.error(f"not a directory or a supported archive: {args.repo_root}")
+    for raw, archive in zip(args.archive, archives):
+        if not archive.is_file():
+            ap.error(f"--archive: no such file: {raw}")
+    if target.is_file():
+        root = target.parent
+        archives.insert(0, target)
+    else:
+        root = target
+
+    changed = None if target.is_file() else changed_from_args(root, args)
+    scope = None if changed is None else scope_for(root, changed)
+
+    stats: Dict[str, int] = {}
+    started = time.perf_counter()
+    findings = [] if target.is_file() else scan_repo(root, shard=shard, stats=stats, scope=scope)
+    for archive in archives:
+        display = _display_path(archive, root)
+        if shard is not None and not shard.owns(display):
+            continue
+        stats["files_scanned"] = stats.get("files_scanned", 0) + 1
+        findings.extend(scan_archive(archive, display))
+    report = build_report(root, findings)
+    report["stats"] = {
+        "files_scanned": stats.get("files_scanned", 0),
+        "elapsed_s": round(time.perf_counter() - started, 3),
+    }
+    if shard is not None:
+        report["shard"] = shard.to_json()
+    write_report(Path(args.json_out), report)
+
+    if args.enforce:
+        return run_policy(report)
     return 0
 
 
@@ -0,0 +1,83 @@
+"""Scoping: changed files map to their projects plus dependents; global inputs mean "all"."""
+
+from __future__ import annotations
+
+import json
+from typing import TYPE_CHECKING
+
+import pytest
+import workspace_graph as wg
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+
+def _package(root: Path, rel: str, name: str, **fields: object) -> None:
+    d = root / rel
+    d.mkdir(parents=True)
+    (d / "package.json").write_text(json.dumps({"name": name, **fields}))
+
+
+@pytest.fixture
+def workspace(tmp_path: Path) -> Path:
+    (tmp_path / "package.json").write_text(json.dumps({"name": "root", "private": True}))
+    (tmp_path / "pnpm-workspace.yaml").write_text(
+        "packages:\n  - 'apps/*'\n  - \"packages/*\"  # libraries\n"
+    )
+    nx = {"implicitDependencies": {"babel.config.js": "*"}}
+    (tmp_path / "nx.json").write_text(json.dumps(nx))
+    _package(tmp_path, "packages/core", "@c/core")
+    _package(tmp_path, "packages/ui", "@c/ui", dependencies={"@c/core": "workspace:*"})
+    _package(tmp_path, "packages/tools", "@c/tools", devDependencies={"eslint": "^9"})
+    _package(tmp_path, "apps/mobile", "mobile", dependencies={"@c/ui": "workspace:^"})
+    _package(tmp_path, "apps/admin", "admin", nx={"implicitDependencies": ["@c/tools"]})
+    return tmp_path
+
+
+def _names(projects: list[wg.Project] | None) -> list[str] | None:
+    return None if projects is None else sorted(p.name for p in projects)
+
+
+def test_affected_includes_transitive_dependents(workspace: Path) -> None:
+    graph = wg.load_graph(workspace, use_disk_cache=False)
+    assert _names(graph.affected(["packages/core/src/index.ts"])) == ["@c/core", "@c/ui", "mobile"]
+    assert _names(graph.affected(["./packages/tools/lint.js"])) == ["@c/tools", "admin"]
+    assert _names(graph.affected(["apps/mobile/App.tsx"])) == ["mobile"]
+    assert _names(graph.affected(["docs/README.md"])) == []
+
+
+@pytest.mark.parametrize(
+    "changed",
+    [
+        "pnpm-lock.yaml",
+        "package.json",
+        "scripts/secret_scan_redacted.py",
+        ".github/workflows/token-storage-scan.yml",
+        "babel.config.js",  # nx.json implicitDependencies
+    ],
+)
+def test_global_inputs_affect_everything(workspace: Path, changed: str) -> None:
+    graph = wg.load_graph(workspace, use_disk_cache=False)
+    assert graph.affected(["apps/mobile/App.tsx", changed]) is None
+    assert wg.scope_for(workspace, [changed]) is None
+
+
+def test_scope_covers_affected_roots_and_loose_files(workspace: Path) -> None:
+    scope = wg.scope_for(workspace, ["packages/ui/Button.tsx", "docs/setup.md"])
+
+    assert scope is not None
+    assert set(scope.project_roots) == {"packages/ui", "apps/mobile"}
+    assert scope.includes("apps/mobile/src/secret.ts")
+    assert scope.includes("docs/setup.md")
+    assert not scope.includes("packages/core/index.ts")
+    assert not scope.includes("docs/other.md")
+    assert scope.may_contain("apps")
+    assert not scope.may_contain("packages/core")
+
+
+def test_disk_cache_round_trips(workspace: Path) -> None:
+    built = wg.load_graph(workspace, use_disk_cache=True)
+    assert (workspace / wg.CACHE_PATH).is_file()
+
+    wg.load_graph.cache_clear()
+    assert wg.load_graph(workspace, use_disk_cache=True) == built
@@ -10,10 +10,22 @@ Policy (fail-closed):
 
 from __future__ import annotations
 
+import argparse
+import json
+import os
 import re
-from dataclasses import dataclass
+import time
+from dataclasses import asdict, dataclass
 from pathlib import Path
-from typing import Iterable, List
+from typing import Any, Dict, Iterable, List, Optional
+
+from scan_sharding import Shard, parse_shard, sort_findings
+from workspace_graph import Project, add_scope_args, changed_from_args, load_graph
+
+WORKSPACE_ROOT = Path(".")
+SOURCE_SUFFIXES = (".ts", ".tsx", ".js", ".jsx")
+# Native shells, dependencies and build output are not shared JS source.
+SKIP_DIR_NAMES = {"node_modules", "dist", "build", "android", "ios"}
 
 TOKEN_KEY_RE = re.compile(r"(token|access|refresh)", re.IGNORECASE)
 ASYNC_SETITEM_RE = re.compile(r"\bAsyncStorage\.setItem\s*\(", re.IGNORECASE)
@@ -31,27 +43,52 @@ class Finding:
     snippet: str
 
 
-def _iter_source_files(roots: Iterable[Path]) -> Iterable[Path]:
+def _iter_source_files(roots: Iterable[Path], shard: Optional[Shard] = None) -> Iterable[Path]:
     for root in roots:
         if not root.exists():
             continue
-        for p in root.rglob("*"):
-            if not p.is_file():
-                continue
-            if p.suffix.lower() not in (".ts", ".tsx", ".js", ".jsx"):
-                continue
-            if any(part in {"node_modules", "dist", "build", "android", "ios"} for part in p.parts):
-                continue
-            yield p
+        # Prune skipped trees while walking so a project's node_modules is never listed.
+        for dirpath, dirnames, filenames in os.walk(root):
+            dirnames[:] = sorted(d for d in dirnames if d not in SKIP_DIR_NAMES)
+            for name in sorted(filenames):
+                p = Path(dirpath) / name
+                if p.suffix.lower() not in SOURCE_SUFFIXES or not p.is_file():
+                    continue
+                if shard is not None and not shard.owns(p.as_posix()):
+                    continue
+                yield p
+
+
+def _source_root(project: Project) -> Path:
+    # The whole project, not just src/: entry points such as App.tsx and index.js
+    # live at the project root.
+    return WORKSPACE_ROOT / project.root
+
+
+def _scan_roots(changed: Optional[List[str]]) -> List[Path]:
+    """Source roots of every workspace project, or only the affected ones for a changed set."""
+    graph = load_graph(WORKSPACE_ROOT)
+    projects = graph.projects if changed is None else graph.affected(changed)
+    if projects is None:
+        projects = graph.projects
+    return [_source_root(p) for p in projects]
 
 
 def _scan_file(p: Path) -> List[Finding]:
-    out: List[Finding] = []
     try:
         text = p.read_text(encoding="utf-8", errors="replace")
     except Exception:
-        return out
+        return []
+    return scan_text(str(p), text)
 
+
+def is_source_name(name: str) -> bool:
+    return Path(name).suffix.lower() in SOURCE_SUFFIXES
+
+
+def scan_text(file: str, text: str) -> List[Finding]:
+    """Apply the storage-write rules to in-memory source; `file` is only used for reporting."""
+    out: List[Finding] = []
     for idx, line in enumerate(text.splitlines(), start=1):
         is_async = bool(ASYNC_SETITEM_RE.search(line))
         is_web = bool(WEB_SETITEM_RE.search(line))
@@ -64,7 +101,7 @@ def _scan_file(p: Path) -> List[Finding]:
             if TOKEN_KEY_RE.search(key):
                 out.append(
                     Finding(
-                        file=str(p),
+                        file=file,
                         line=idx,
                         kind="async_storage_setItem" if is_async else "web_storage_setItem",
                         key_hint=key,
@@ -79,7 +116,7 @@ def _scan_file(p: Path) -> List[Finding]:
             if TOKEN_KEY_RE.search(ident):
                 out.append(
                     Finding(
-                        file=str(p),
+                        file=file,
                         line=idx,
                         kind="async_storage_setItem" if is_async else "web_storage_setItem",
                         key_hint=ident,
@@ -91,7 +128,7 @@ def _scan_file(p: Path) -> List[Finding]:
         if TOKEN_KEY_RE.search(line):
             out.append(
                 Finding(
-                    file=str(p),
+                    file=file,
                     line=idx,
                     kind="async_storage_setItem" if is_async else "web_storage_setItem",
                     key_hint="<unknown>",
@@ -101,12 +138,7 @@ def _scan_file(p: Path) -> List[Finding]:
     return out
 
 
-def main() -> int:
-    roots = [Path("frontend-react-native/src")]
-    findings: List[Finding] = []
-    for f in _iter_source_files(roots):
-        findings.extend(_scan_file(f))
-
+def report_findings(findings: List[Finding]) -> int:
     if findings:
         print("[FAIL] token storage scan: disallowed storage writes detected\n")
         for x in findings[:200]:
@@ -120,6 +152,52 @@ def main() -> int:
     return 0
 
 
+def build_report(roots: Iterable[Path], findings: Iterable[Finding]) -> Dict[str, Any]:
+    return {
+        "roots": [r.as_posix() for r in roots],
+        "findings": sort_findings(asdict(f) for f in findings),
+    }
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--shard", help="Scan only shard i of N (1-based, e.g. 2/4); merge with merge_scan_shards.py")
+    ap.add_argument(
+        "--json-out",
+        help="Write a JSON report instead of enforcing; policy is applied by merge_scan_shards.py",
+    )
+    add_scope_args(ap)
+    args = ap.parse_args()
+
+    try:
+        shard = parse_shard(args.shard)
+    except ValueError as e:
+        ap.error(str(e))
+
+    roots = _scan_roots(changed_from_args(WORKSPACE_ROOT, args))
+    findings: List[Finding] = []
+    files_scanned = 0
+    started = time.perf_counter()
+    for f in _iter_source_files(roots, shard=shard):
+        files_scanned += 1
+        findings.extend(_scan_file(f))
+
+    if args.json_out:
+        report = build_report(roots, findings)
+        report["stats"] = {
+            "files_scanned": files_scanned,
+            "elapsed_s": round(time.perf_counter() - started, 3),
+        }
+        if shard is not None:
+            report["shard"] = shard.to_json()
+        Path(args.json_out).write_text(
+            json.dumps(report, indent=2, sort_keys=True) + "\n", encoding="utf-8"
+        )
+        return 0
+
+    return report_findings(findings)
+
+
 if __name__ == "__main__":
     raise SystemExit(main())
 
@@ -0,0 +1,371 @@
+#!/usr/bin/env python3
+"""
+Workspace project graph for scoping the repo scanners (nx + pnpm).
+
+Projects are the directories matched by `pnpm-workspace.yaml` that contain a
+package.json; edges are `workspace:` dependencies between them, plus any
+`nx.implicitDependencies`. Given a changed-file set, `affected()` returns the
+touched projects and everything that depends on them, so PR scans cost only
+the affected subgraph while a full run still covers the whole workspace.
+
+The graph is cached in-process and on disk (keyed by manifest stat data), so
+repeated scanner invocations in one job do not re-parse every package.json.
+
+Usage (debug):
+    python scripts/workspace_graph.py                     # list projects
+    python scripts/workspace_graph.py --changed-since origin/develop
+"""
+
+from __future__ import annotations
+
+import argparse
+import functools
+import glob
+import hashlib
+import json
+import subprocess
+import sys
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+WORKSPACE_FILE = "pnpm-workspace.yaml"
+NX_FILE = "nx.json"
+CACHE_PATH = ".scan-cache/workspace-graph.json"
+CACHE_VERSION = 2
+
+# Source trees that predate the workspace layout (no package.json of their own).
+LEGACY_PROJECT_ROOTS: Tuple[str, ...] = ("frontend-react-native",)
+
+# Root files every project implicitly depends on; touching one affects everything.
+GLOBAL_INPUTS = {
+    "package.json",
+    "pnpm-lock.yaml",
+    WORKSPACE_FILE,
+    NX_FILE,
+    "tsconfig.json",
+    # The scanners and their CI wiring: a rule change must be checked against the whole tree.
+    "scripts/secret_scan_redacted.py",
+    "scripts/token_storage_scan.py",
+    "scripts/workspace_graph.py",
+    "scripts/scan_sharding.py",
+    "scripts/merge_scan_shards.py",
+    ".github/workflows/security-secret-scan.yml",
+    ".github/workflows/token-storage-scan.yml",
+}
+
+DEP_FIELDS = ("dependencies", "devDependencies", "peerDependencies", "optionalDependencies")
+
+
+def _norm(rel_path: str) -> str:
+    rel = rel_path.replace("\\", "/")
+    while rel.startswith("./"):
+        rel = rel[2:]
+    return rel
+
+
+@dataclass(frozen=True)
+class Project:
+    name: str
+    root: str  # repo-relative POSIX path
+    deps: Tuple[str, ...] = ()
+
+
+@dataclass(frozen=True)
+class WorkspaceGraph:
+    projects: Tuple[Project, ...]
+    global_inputs: Tuple[str, ...] = tuple(sorted(GLOBAL_INPUTS))
+
+    @functools.cached_property
+    def _by_name(self) -> Dict[str, Project]:
+        return {p.name: p for p in self.projects}
+
+    @functools.cached_property
+    def _dependents(self) -> Dict[str, Set[str]]:
+        rev: Dict[str, Set[str]] = {p.name: set() for p in self.projects}
+        for p in self.projects:
+            for d in p.deps:
+                if d in rev:
+                    rev[d].add(p.name)
+        return rev
+
+    @functools.cached_property
+    def _roots_longest_first(self) -> List[Project]:
+        return sorted(self.projects, key=lambda p: len(p.root), reverse=True)
+
+    def project_for(self, rel_path: str) -> Optional[Project]:
+        rel = _norm(rel_path)
+        for p in self._roots_longest_first:
+            if rel == p.root or rel.startswith(p.root + "/"):
+                return p
+        return None
+
+    def with_dependents(self, names: Iterable[str]) -> Set[str]:
+        seen: Set[str] = set()
+        stack = [n for n in names if n in self._by_name]
+        while stack:
+            n = stack.pop()
+            if n in seen:
+                continue
+            seen.add(n)
+            stack.extend(self._dependents.get(n, ()))
+        return seen
+
+    def affected(self, changed: Iterable[str]) -> Optional[List[Project]]:
+        """Projects touched by `changed` plus their dependents; None means "all"."""
+        touched: Set[str] = set()
+        for path in changed:
+            rel = _norm(path)
+            if rel in self.global_inputs:
+                return None
+            p = self.project_for(rel)
+            if p is not None:
+                touched.add(p.name)
+        names = self.with_dependents(touched)
+        return [p for p in self.projects if p.name in names]
+
+
+@dataclass(frozen=True)
+class ScanScope:
+    """Which repo-relative paths a scoped scan should visit."""
+
+    project_roots: Tuple[str, ...]
+    files: frozenset
+
+    def includes(self, rel_path: str) -> bool:
+        rel = _norm(rel_path)
+        if rel in self.files:
+            return True
+        return any(rel.startswith(r + "/") for r in self.project_roots)
+
+    def may_contain(self, rel_dir: str) -> bool:
+        """False when nothing under `rel_dir` can be in scope (lets walkers prune)."""
+        rel = _norm(rel_dir).rstrip("/")
+        if not rel or rel == ".":
+            return True
+        prefix = rel + "/"
+        if any(r == rel or r.startswith(prefix) or rel.startswith(r + "/") for r in self.project_roots):
+            return True
+        return any(f.startswith(prefix) for f in self.files)
+
+
+def _parse_workspace_globs(text: str) -> List[str]:
+    """Read the `packages:` list from pnpm-workspace.yaml (stdlib only; CI has no PyYAML)."""
+    globs: List[str] = []
+    in_packages = False
+    for raw in text.splitlines():
+        line = raw.split("#", 1)[0].rstrip()
+        if not line.strip():
+            continue
+        if not line.startswith((" ", "\t", "-")):
+            in_packages = line.strip() == "packages:"
+            continue
+        if in_packages and line.strip().startswith("-"):
+            globs.append(line.strip()[1:].strip().strip("'\""))
+    return globs
+
+
+def _workspace_globs(root: Path) -> List[str]:
+    ws = root / WORKSPACE_FILE
+    if ws.exists():
+        return _parse_workspace_globs(ws.read_text(encoding="utf-8"))
+    try:
+        workspaces = json.loads((root / "package.json").read_text(encoding="utf-8")).get("workspaces")
+    except (OSError, ValueError):
+        return []
+    if isinstance(workspaces, dict):
+        workspaces = workspaces.get("packages")
+    return list(workspaces or [])
+
+
+def _manifest_paths(root: Path) -> List[Path]:
+    out: List[Path] = []
+    for pattern in _workspace_globs(root):
+        if pattern.startswith("!"):
+            continue
+        for d in sorted(glob.glob(str(root / pattern))):
+            manifest = Path(d) / "package.json"
+            if manifest.is_file():
+                out.append(manifest)
+    return out
+
+
+def _fingerprint(root: Path, manifests: List[Path]) -> str:
+    h = hashlib.sha256()
+    for p in [root / WORKSPACE_FILE, root / NX_FILE, root / "package.json", *manifests]:
+        try:
+            st = p.stat()
+        except OSError:
+            h.update(f"{p}:missing\n".encode())
+            continue
+        h.update(f"{p}:{st.st_mtime_ns}:{st.st_size}\n".encode())
+    for legacy in LEGACY_PROJECT_ROOTS:
+        h.update(f"{legacy}:{(root / legacy).is_dir()}\n".encode())
+    return h.hexdigest()
+
+
+def _build(root: Path, manifests: List[Path]) -> WorkspaceGraph:
+    raw: List[Tuple[str, str, dict]] = []
+    for m in manifests:
+        try:
+            data = json.loads(m.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            continue
+        rel = m.parent.relative_to(root).as_posix()
+        raw.append((data.get("name") or rel, rel, data))
+
+    names = {name for name, _, _ in raw}
+    projects: List[Project] = []
+    for name, rel, data in raw:
+        deps: Set[str] = set()
+        for field in DEP_FIELDS:
+            deps.update(d for d in (data.get(field) or {}) if d in names)
+        deps.update(d for d in ((data.get("nx") or {}).get("implicitDependencies") or []) if d in names)
+        deps.discard(name)
+        projects.append(Project(name=name, root=rel, deps=tuple(sorted(deps))))
+
+    for legacy in LEGACY_PROJECT_ROOTS:
+        if (root / legacy).is_dir() and legacy not in {p.root for p in projects}:
+            projects.append(Project(name=legacy, root=legacy))
+
+    global_inputs = set(GLOBAL_INPUTS)
+    try:
+        nx = json.loads((root / NX_FILE).read_text(encoding="utf-8"))
+        # nx's workspace-wide implicitDependencies: {"file": "*"} or ["file", ...]
+        global_inputs.update(nx.get("implicitDependencies") or [])
+    except (OSError, ValueError):
+        pass
+
+    return WorkspaceGraph(
+        projects=tuple(sorted(projects, key=lambda p: p.root)),
+        global_inputs=tuple(sorted(global_inputs)),
+    )
+
+
+@functools.lru_cache(maxsize=None)
+def load_graph(root: Path, use_disk_cache: bool = True) -> WorkspaceGraph:
+    """Build (or load the cached) workspace graph for `root`."""
+    root = root.resolve()
+    manifests = _manifest_paths(root)
+    key = _fingerprint(root, manifests)
+    cache = root / CACHE_PATH
+
+    if use_disk_cache:
+        try:
+            data = json.loads(cache.read_text(encoding="utf-8"))
+            if data.get("version") == CACHE_VERSION and data.get("key") == key:
+                return WorkspaceGraph(
+                    projects=tuple(
+                        Project(name=p["name"], root=p["root"], deps=tuple(p["deps"]))
+                        for p in data["projects"]
+                    ),
+                    global_inputs=tuple(data["global_inputs"]),
+                )
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+
+    graph = _build(root, manifests)
+
+    if use_disk_cache:
+        try:
+            cache.parent.mkdir(parents=True, exist_ok=True)
+            cache.write_text(
+                json.dumps(
+                    {
+                        "version": CACHE_VERSION,
+                        "key": key,
+                        "projects": [asdict(p) for p in graph.projects],
+                        "global_inputs": list(graph.global_inputs),
+                    },
+                    indent=2,
+                    sort_keys=True,
+                )
+                + "\n",
+                encoding="utf-8",
+            )
+        except OSError:
+            pass
+    return graph
+
+
+def scope_for(root: Path, changed: Iterable[str]) -> Optional[ScanScope]:
+    """Affected projects (with dependents) plus changed files outside any project.
+
+    None means a global input changed and the whole tree must be scanned.
+    """
+    changed = [_norm(c) for c in changed]
+    graph = load_graph(root)
+    projects = graph.affected(changed)
+    if projects is None:
+        return None
+    return ScanScope(
+        project_roots=tuple(p.root for p in projects),
+        files=frozenset(c for c in changed if graph.project_for(c) is None),
+    )
+
+
+def changed_files_since(root: Path, base: str) -> List[str]:
+    """Files changed between `base` and HEAD (merge-base diff, as CI PR checks see it)."""
+    r = subprocess.run(
+        ["git", "diff", "--name-only", f"{base}...HEAD"],
+        cwd=root,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+    if r.returncode != 0:
+        raise RuntimeError(f"git diff against {base!r} failed: {r.stderr.strip()}")
+    return [line for line in r.stdout.splitlines() if line]
+
+
+def read_changed_files(path: str) -> List[str]:
+    """Newline-separated file list; `-` reads stdin."""
+    text = sys.stdin.read() if path == "-" else Path(path).read_text(encoding="utf-8")
+    return [line.strip() for line in text.splitlines() if line.strip()]
+
+
+def add_scope_args(ap: argparse.ArgumentParser) -> None:
+    """Shared scanner flags for affected-project scoping."""
+    group = ap.add_mutually_exclusive_group()
+    group.add_argument(
+        "--changed-since",
+        metavar="REF",
+        help="Scan only workspace projects affected by changes since REF (and their dependents)",
+    )
+    group.add_argument(
+        "--changed-files",
+        metavar="FILE",
+        help="Like --changed-since, but read the changed paths from FILE ('-' for stdin)",
+    )
+
+
+def changed_from_args(root: Path, args: argparse.Namespace) -> Optional[List[str]]:
+    """Changed-file set from scanner args; None means no scoping (full scan)."""
+    if getattr(args, "changed_since", None):
+        return changed_files_since(root, args.changed_since)
+    if getattr(args, "changed_files", None):
+        return read_changed_files(args.changed_files)
+    return None
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--root", default=".")
+    add_scope_args(ap)
+    args = ap.parse_args()
+
+    root = Path(args.root).resolve()
+    graph = load_graph(root)
+    changed = changed_from_args(root, args)
+    selected = graph.projects if changed is None else graph.affected(changed)
+    if selected is None:
+        print("(global input changed: all projects affected)")
+        selected = graph.projects
+    for p in selected:
+        deps = f" -> {', '.join(p.deps)}" if p.deps else ""
+        print(f"{p.name} ({p.root}){deps}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())